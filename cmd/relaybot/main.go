@@ -41,7 +41,7 @@ func main() {
 	ctx, stop := signal.NotifyContext(context.Background(), os.Interrupt, syscall.SIGTERM)
 	defer stop()
 
-	client, err := telegramx.New(cfg.BotToken)
+	client, err := telegramx.New(cfg.BotToken, cfg.BotAPIURL)
 	if err != nil {
 		log.Fatalf("初始化 Telegram 客户端失败: %v", err)
 	}
@@ -62,15 +62,13 @@ func main() {
 	logStartupDiagnostics(ctx, client, cfg)
 
 	relayApp := app.New(cfg, db, client)
-	updates, err := client.Updates(ctx)
+	updates, err := client.Updates(ctx, cfg)
 	if err != nil {
-		log.Fatalf("启动 Telegram 长轮询失败: %v", err)
+		log.Fatalf("启动 Telegram 更新接收失败: %v", err)
 	}
 
 	log.Printf("机器人启动完成: mode=%s db=%s", cfg.RelayMode, cfg.DBPath)
-	for update := range updates {
-		relayApp.HandleUpdate(ctx, update)
-	}
+	relayApp.Run(ctx, updates)
 	log.Println("机器人已停止。")
 }
 
@@ -3,7 +3,6 @@ module telegramrelaypm
 go 1.26.1
 
 require (
-	github.com/joho/godotenv v1.5.1
 	github.com/mymmrac/telego v1.9.0
 	modernc.org/sqlite v1.51.0
 )
@@ -0,0 +1,153 @@
+package app
+
+import (
+	"context"
+	"fmt"
+	"log"
+	"sort"
+	"sync"
+	"time"
+
+	"telegramrelaypm/internal/config"
+	"telegramrelaypm/internal/store"
+	"telegramrelaypm/internal/telegramx"
+
+	"github.com/mymmrac/telego"
+)
+
+const (
+	albumCollectDelay = 500 * time.Millisecond
+	albumRelayTimeout = 30 * time.Second
+)
+
+type albumKey struct {
+	chatID       int64
+	mediaGroupID string
+}
+
+// collectAlbum buffers msg if it belongs to a media group and reports whether
+// it did. The first item of a group schedules relay with every item of that
+// group received within albumCollectDelay, in message ID order. The relay
+// runs outside the chat's update worker on a context detached from ctx, so
+// albums still buffered when shutdown cancels ctx are delivered, not dropped.
+func (a *App) collectAlbum(ctx context.Context, msg *telego.Message, relay func(ctx context.Context, msgs []*telego.Message)) bool {
+	if msg.MediaGroupID == "" {
+		return false
+	}
+	key := albumKey{chatID: msg.Chat.ID, mediaGroupID: msg.MediaGroupID}
+	a.albumsMu.Lock()
+	defer a.albumsMu.Unlock()
+	if msgs, ok := a.albums[key]; ok {
+		a.albums[key] = append(msgs, msg)
+		return true
+	}
+	a.albums[key] = []*telego.Message{msg}
+	a.albumWG.Add(1)
+	time.AfterFunc(albumCollectDelay, func() {
+		defer a.albumWG.Done()
+		a.albumsMu.Lock()
+		msgs := a.albums[key]
+		delete(a.albums, key)
+		a.albumsMu.Unlock()
+		sort.Slice(msgs, func(i, j int) bool { return msgs[i].MessageID < msgs[j].MessageID })
+		relayCtx, cancel := context.WithTimeout(context.WithoutCancel(ctx), albumRelayTimeout)
+		defer cancel()
+		relay(relayCtx, msgs)
+	})
+	return true
+}
+
+func (a *App) copyAlbum(ctx context.Context, chatID int64, threadID *int, msgs []*telego.Message) ([]int, error) {
+	ids := make([]int, len(msgs))
+	for i, m := range msgs {
+		ids[i] = m.MessageID
+	}
+	sent, err := a.Client.CopyMessages(ctx, telegramx.CopyMessagesRequest{ChatID: chatID, ThreadID: threadID, FromChatID: msgs[0].Chat.ID, MessageIDs: ids})
+	if err == nil && len(sent) != len(ids) {
+		err = fmt.Errorf("copied %d of %d album messages", len(sent), len(ids))
+	}
+	return sent, err
+}
+
+func (a *App) relayUserAlbum(ctx context.Context, msgs []*telego.Message) {
+	first := msgs[0]
+	userID := first.From.ID
+	if a.Cfg.RelayMode != config.RelayModeGroupTopic {
+		var wg sync.WaitGroup
+		for _, adminID := range a.Cfg.AdminChatIDs {
+			wg.Add(1)
+			go func(adminID int64) {
+				defer wg.Done()
+				a.copyUserAlbum(ctx, msgs, adminID, nil)
+			}(adminID)
+		}
+		wg.Wait()
+		return
+	}
+	if a.Cfg.AdminGroupChatID == nil {
+		return
+	}
+	threadID, err := a.ensureUserTopic(ctx, userID, first.From.Username, fullName(first.From))
+	if err != nil {
+		log.Printf("ensure topic failed for user=%d err=%v", userID, err)
+		events := make([]store.AuditEvent, len(msgs))
+		for i, m := range msgs {
+			kind := messageKind(m)
+			events[i] = store.AuditEvent{EventType: "forward_user_to_admin", UserID: &userID, AdminChatID: a.Cfg.AdminGroupChatID, ChatID: &m.Chat.ID, MessageID: &m.MessageID, MessageKind: &kind, Direction: strPtr("user_to_admin"), Outcome: "failed", ErrorClass: strPtr("topic")}
+		}
+		_ = a.Store.RecordAuditEvents(ctx, events)
+		return
+	}
+	a.copyUserAlbum(ctx, msgs, *a.Cfg.AdminGroupChatID, &threadID)
+}
+
+func (a *App) copyUserAlbum(ctx context.Context, msgs []*telego.Message, adminChatID int64, threadID *int) {
+	userID := msgs[0].From.ID
+	sent, err := a.copyAlbum(ctx, adminChatID, threadID, msgs)
+	if err != nil {
+		log.Printf("copy user album to admin failed: user=%d admin=%d err=%v", userID, adminChatID, err)
+	} else {
+		// copyMessages cannot attach reply markup, so the action keyboard that
+		// single relays carry follows the album as a reply to its first item.
+		kb := adminActionKeyboard(userID, nil)
+		if _, err := a.Client.SendMessage(ctx, telegramx.SendMessageRequest{ChatID: adminChatID, ThreadID: threadID, Text: fmt.Sprintf("用户 %d 发送的相册（%d 项）", userID, len(msgs)), ReplyTo: &telegramx.ReplyRef{ChatID: adminChatID, MessageID: sent[0]}, ReplyMarkup: &kb}); err != nil {
+			log.Printf("send album action keyboard failed: user=%d admin=%d err=%v", userID, adminChatID, err)
+		}
+	}
+	maps := make([]store.MessageMap, 0, len(sent))
+	events := make([]store.AuditEvent, len(msgs))
+	for i, m := range msgs {
+		kind := messageKind(m)
+		events[i] = store.AuditEvent{EventType: "forward_user_to_admin", UserID: &userID, AdminChatID: &adminChatID, ChatID: &m.Chat.ID, MessageID: &m.MessageID, MessageKind: &kind, Direction: strPtr("user_to_admin"), Outcome: "failed"}
+		if err == nil {
+			events[i].MappedMessageID, events[i].Outcome = &sent[i], "success"
+			maps = append(maps, store.MessageMap{UserChatID: userID, AdminChatID: adminChatID, UserMessageID: m.MessageID, AdminMessageID: sent[i], Direction: "user_to_admin"})
+		}
+	}
+	if err := a.Store.SaveMappings(ctx, maps); err != nil {
+		log.Printf("save album mappings failed: count=%d err=%v", len(maps), err)
+	}
+	_ = a.Store.RecordAuditEvents(ctx, events)
+}
+
+func (a *App) copyAdminAlbum(ctx context.Context, msgs []*telego.Message, target int64, eventType string) {
+	adminChatID := msgs[0].Chat.ID
+	sent, err := a.copyAlbum(ctx, target, nil, msgs)
+	if err != nil {
+		log.Printf("copy admin album to user failed: target=%d err=%v", target, err)
+	}
+	maps := make([]store.MessageMap, 0, len(sent))
+	events := make([]store.AuditEvent, len(msgs))
+	for i, m := range msgs {
+		kind := messageKind(m)
+		events[i] = store.AuditEvent{EventType: eventType, UserID: &target, AdminChatID: &adminChatID, ChatID: &adminChatID, MessageID: &m.MessageID, MessageKind: &kind, Direction: strPtr("admin_to_user"), Outcome: "failed"}
+		if err == nil {
+			events[i].MappedMessageID, events[i].Outcome = &sent[i], "success"
+			maps = append(maps, store.MessageMap{UserChatID: target, AdminChatID: adminChatID, UserMessageID: sent[i], AdminMessageID: m.MessageID, Direction: "admin_to_user"})
+		}
+	}
+	if err := a.Store.SaveMappings(ctx, maps); err != nil {
+		log.Printf("save album mappings failed: count=%d err=%v", len(maps), err)
+	}
+	_ = a.Store.RecordAuditEvents(ctx, events)
+}
@@ -2,6 +2,7 @@ package app
 
 import (
 	"context"
+	"errors"
 	"fmt"
 	"log"
 	"strconv"
@@ -9,6 +10,7 @@ import (
 	"sync"
 	"time"
 
+	"telegramrelaypm/internal/cache"
 	"telegramrelaypm/internal/config"
 	"telegramrelaypm/internal/domain"
 	"telegramrelaypm/internal/store"
@@ -18,14 +20,15 @@ import (
 )
 
 type Store interface {
+	Transaction(ctx context.Context, fn func(ctx context.Context) error) error
 	TouchUser(ctx context.Context, userID int64, username, fullName string) error
 	SaveMapping(ctx context.Context, m store.MessageMap) error
+	SaveMappings(ctx context.Context, maps []store.MessageMap) error
 	GetTargetUserByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) (*int64, error)
-	GetUserToAdminMaps(ctx context.Context, userChatID int64, userMessageID int) ([]store.MessageMap, error)
-	GetAdminToUserMaps(ctx context.Context, adminChatID int64, adminMessageID int) ([]store.MessageMap, error)
+	GetLinkedMaps(ctx context.Context, chatID int64, messageID int) ([]store.MessageMap, error)
 	GetMapsByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) ([]store.MessageMap, error)
-	GetRecentUsers(ctx context.Context, limit int, excludeUserID *int64) ([]store.User, error)
-	GetAllUsers(ctx context.Context, excludeUserID *int64) ([]int64, error)
+	GetRecentUsers(ctx context.Context, limit int, excludeUserIDs []int64) ([]store.User, error)
+	GetAllUsers(ctx context.Context, excludeUserIDs []int64) ([]int64, error)
 	SetCurrentSession(ctx context.Context, adminChatID int64, userID *int64) error
 	GetCurrentSession(ctx context.Context, adminChatID int64) (*int64, error)
 	GetUserTopic(ctx context.Context, userID int64) (*store.UserTopic, error)
@@ -37,12 +40,14 @@ type Store interface {
 	GetBan(ctx context.Context, userID int64) (*store.Ban, error)
 	IsUserBanned(ctx context.Context, userID int64) (bool, error)
 	ListActiveBans(ctx context.Context, limit int) ([]store.Ban, error)
+	PurgeExpiredBans(ctx context.Context) (int64, error)
 	AddAutoReplyRule(ctx context.Context, triggerType, triggerText, replyText string, priority int, createdByAdminID int64) (int64, error)
 	ListAutoReplyRules(ctx context.Context, limit int) ([]store.Rule, error)
 	SetAutoReplyRuleEnabled(ctx context.Context, ruleID int64, enabled bool) (bool, error)
 	DeleteAutoReplyRule(ctx context.Context, ruleID int64) (bool, error)
 	MatchAutoReplyRule(ctx context.Context, text string) (*store.Rule, error)
 	RecordAuditEvent(ctx context.Context, e store.AuditEvent) error
+	RecordAuditEvents(ctx context.Context, events []store.AuditEvent) error
 	GetStatsCounts(ctx context.Context, sinceISO string) ([]store.StatCount, error)
 	GetTopUsersByEvents(ctx context.Context, sinceISO string, limit int) ([]store.TopUser, error)
 	DeleteMappingsByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) (int64, error)
@@ -60,37 +65,100 @@ type App struct {
 	Client  telegramx.Client
 	pending map[int64]PendingInput
 	mu      sync.Mutex
+
+	albumsMu sync.Mutex
+	albums   map[albumKey][]*telego.Message
+	albumWG  sync.WaitGroup
+
+	broadcastWG sync.WaitGroup
+
+	topicLocks keyedMutex
 }
 
 func New(cfg *config.Config, st Store, client telegramx.Client) *App {
-	return &App{Cfg: cfg, Store: st, Client: client, pending: map[int64]PendingInput{}}
+	return &App{Cfg: cfg, Store: st, Client: client, pending: map[int64]PendingInput{}, albums: map[albumKey][]*telego.Message{}}
 }
 
-func (a *App) HandleUpdate(ctx context.Context, update telego.Update) {
-	if a.Cfg.RelayMode == config.RelayModeGroupTopic && a.Cfg.AdminGroupChatID != nil {
-		if msg := regularMessage(&update); msg != nil && msg.Chat.ID == *a.Cfg.AdminGroupChatID {
-			log.Printf("配置群组收到Update：%s", updateLogMeta(update))
+const (
+	updateWorkers       = 8
+	updateQueueSize     = 64
+	banJanitorInterval  = 10 * time.Minute
+	deleteConcurrency   = 10
+	editSyncConcurrency = 10
+	broadcastSaveBatch  = 100
+)
+
+func (a *App) Run(ctx context.Context, updates <-chan telego.Update) {
+	queues := make([]chan telego.Update, updateWorkers)
+	var wg sync.WaitGroup
+	stop := make(chan struct{})
+	wg.Add(1)
+	go func() {
+		defer wg.Done()
+		a.runBanJanitor(ctx, stop)
+	}()
+	for i := range queues {
+		queues[i] = make(chan telego.Update, updateQueueSize)
+		wg.Add(1)
+		go func(queue <-chan telego.Update) {
+			defer wg.Done()
+			for update := range queue {
+				a.HandleUpdate(ctx, update)
+			}
+		}(queues[i])
+	}
+	for update := range updates {
+		queues[uint64(updateChatID(update))%updateWorkers] <- update
+	}
+	for _, queue := range queues {
+		close(queue)
+	}
+	close(stop)
+	wg.Wait()
+	a.albumWG.Wait()
+	a.broadcastWG.Wait()
+}
+
+func (a *App) runBanJanitor(ctx context.Context, stop <-chan struct{}) {
+	ticker := time.NewTicker(banJanitorInterval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-stop:
+			return
+		case <-ticker.C:
+			if _, err := a.Store.PurgeExpiredBans(ctx); err != nil {
+				log.Printf("purge expired bans failed: %v", err)
+			}
 		}
 	}
-	if update.CallbackQuery != nil {
+}
+
+func (a *App) HandleUpdate(ctx context.Context, update telego.Update) {
+	switch {
+	case update.Message != nil:
+		a.handleMessage(ctx, update)
+	case update.CallbackQuery != nil:
 		a.handleCallback(ctx, update)
-		return
-	}
-	if update.EditedMessage != nil || update.EditedChannelPost != nil {
+	case update.EditedMessage != nil || update.EditedChannelPost != nil:
 		a.handleEditedMessage(ctx, update)
-		return
-	}
-	if update.ChannelPost != nil {
+	case update.ChannelPost != nil:
+		if a.Cfg.IsAdminGroupChat(update.ChannelPost.Chat.ID) {
+			log.Printf("配置群组收到Update：%s", updateLogMeta(update))
+		}
 		if telegramx.IsCommandLike(update.ChannelPost.Text, update.ChannelPost.Caption) {
 			return
 		}
 		a.handleGroupTopicMessage(ctx, update)
-		return
-	}
-	if update.Message == nil {
-		return
 	}
+}
+
+func (a *App) handleMessage(ctx context.Context, update telego.Update) {
 	msg := update.Message
+	private := msg.Chat.Type == telego.ChatTypePrivate
+	if !private && a.Cfg.IsAdminGroupChat(msg.Chat.ID) {
+		log.Printf("配置群组收到Update：%s", updateLogMeta(update))
+	}
 	if command, args, ok := parseCommand(msg.Text); ok {
 		a.handleCommand(ctx, update, command, args)
 		return
@@ -98,7 +166,7 @@ func (a *App) HandleUpdate(ctx context.Context, update telego.Update) {
 	if a.consumePending(ctx, update) {
 		return
 	}
-	if msg.Chat.Type == telego.ChatTypePrivate {
+	if private {
 		if msg.From != nil && a.Cfg.IsAdmin(msg.From.ID) {
 			a.handleAdminMessage(ctx, update)
 			return
@@ -106,9 +174,8 @@ func (a *App) HandleUpdate(ctx context.Context, update telego.Update) {
 		a.handlePrivateUserMessage(ctx, update)
 		return
 	}
-	if a.Cfg.RelayMode == config.RelayModeGroupTopic && a.Cfg.AdminGroupChatID != nil && msg.Chat.ID == *a.Cfg.AdminGroupChatID {
+	if a.Cfg.IsAdminGroupChat(msg.Chat.ID) {
 		a.handleGroupTopicMessage(ctx, update)
-		return
 	}
 }
 
@@ -205,45 +272,39 @@ func (a *App) recentCmd(ctx context.Context, update telego.Update, args []string
 		return
 	}
 	limit := parseLimit(args, 10, 1, 100)
-	rows, err := a.Store.GetRecentUsers(ctx, limit, nil)
+	rows, err := a.Store.GetRecentUsers(ctx, limit, a.Cfg.AdminChatIDs)
 	if err != nil {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "查询失败。", nil)
 		return
 	}
-	lines := []string{"最近活跃用户："}
-	idx := 1
-	for _, row := range rows {
-		if a.Cfg.IsAdmin(row.UserID) {
-			continue
-		}
+	if len(rows) == 0 {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "暂无用户记录。", nil)
+		return
+	}
+	var b strings.Builder
+	b.Grow(64 * (len(rows) + 1))
+	b.WriteString("最近活跃用户：")
+	for i, row := range rows {
 		uname := "-"
 		if row.Username != "" {
 			uname = "@" + row.Username
 		}
-		lines = append(lines, fmt.Sprintf("%d. %s | ID: %d | 用户名: %s | 最后活跃: %s", idx, row.FullName, row.UserID, uname, row.LastActiveAt))
-		idx++
-	}
-	if len(lines) == 1 {
-		lines = []string{"暂无用户记录。"}
+		fmt.Fprintf(&b, "\n%d. %s | ID: %d | 用户名: %s | 最后活跃: %s", i+1, row.FullName, row.UserID, uname, row.LastActiveAt)
 	}
-	a.reply(ctx, msg.Chat.ID, threadPtr(msg), strings.Join(lines, "\n"), nil)
+	a.reply(ctx, msg.Chat.ID, threadPtr(msg), b.String(), nil)
 }
 
 func (a *App) sessionCmd(ctx context.Context, update telego.Update, args []string) {
 	msg := update.Message
-	if msg == nil || !a.isAdminCommandContext(update) {
+	adminChatID := a.adminChatID(update)
+	if msg == nil || adminChatID == 0 {
 		a.noPerm(ctx, msg)
 		return
 	}
-	if a.Cfg.RelayMode == config.RelayModeGroupTopic && a.Cfg.AdminGroupChatID != nil && msg.Chat.ID == *a.Cfg.AdminGroupChatID {
+	if a.Cfg.IsAdminGroupChat(msg.Chat.ID) {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "群组话题模式下无需 /session，请直接在对应用户话题发送消息。", nil)
 		return
 	}
-	adminChatID := a.adminChatID(update)
-	if adminChatID == 0 {
-		a.noPerm(ctx, msg)
-		return
-	}
 	if len(args) == 0 {
 		current, _ := a.Store.GetCurrentSession(ctx, adminChatID)
 		if current == nil {
@@ -258,7 +319,7 @@ func (a *App) sessionCmd(ctx context.Context, update telego.Update, args []strin
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "已清空当前会话。", nil)
 		return
 	}
-	uid, err := strconv.ParseInt(args[0], 10, 64)
+	uid, err := parseInt64Arg(args[0])
 	if err != nil {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/session <用户ID> 或 /session clear", nil)
 		return
@@ -274,21 +335,26 @@ func (a *App) sessionCmd(ctx context.Context, update telego.Update, args []strin
 
 func (a *App) banCmd(ctx context.Context, update telego.Update, args []string) {
 	msg := update.Message
-	if msg == nil || !a.isAdminCommandContext(update) {
+	adminChatID := a.adminChatID(update)
+	if msg == nil || adminChatID == 0 {
 		a.noPerm(ctx, msg)
 		return
 	}
-	adminChatID := a.adminChatID(update)
 	target, rest := a.targetFromArgOrReply(ctx, update, args)
 	if target == nil {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/ban <用户ID> [1h|1d|7d|YYYY-MM-DD] [原因]，或回复用户转发消息后 /ban", nil)
 		return
 	}
 	expires, reason, note := domain.ParseBanExtraArgs(rest)
-	_ = a.Store.BanUser(ctx, *target, adminChatID, reason, note, expires)
-	if cur, _ := a.Store.GetCurrentSession(ctx, adminChatID); cur != nil && *cur == *target {
-		_ = a.Store.SetCurrentSession(ctx, adminChatID, nil)
-	}
+	_ = a.Store.Transaction(ctx, func(ctx context.Context) error {
+		if err := a.Store.BanUser(ctx, *target, adminChatID, reason, note, expires); err != nil {
+			return err
+		}
+		if cur, _ := a.Store.GetCurrentSession(ctx, adminChatID); cur != nil && *cur == *target {
+			return a.Store.SetCurrentSession(ctx, adminChatID, nil)
+		}
+		return nil
+	})
 	ban, _ := a.Store.GetBan(ctx, *target)
 	if ban != nil {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), store.FormatBanInfo(*ban), nil)
@@ -308,7 +374,9 @@ func (a *App) banListCmd(ctx context.Context, update telego.Update, args []strin
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "当前没有有效封禁。", nil)
 		return
 	}
-	lines := []string{"当前封禁列表："}
+	var b strings.Builder
+	b.Grow(64 * (len(rows) + 1))
+	b.WriteString("当前封禁列表：")
 	for i, row := range rows {
 		reason := strings.TrimSpace(row.Reason)
 		if reason == "" {
@@ -318,9 +386,9 @@ func (a *App) banListCmd(ctx context.Context, update telego.Update, args []strin
 		if note == "" {
 			note = "-"
 		}
-		lines = append(lines, fmt.Sprintf("%d. 用户ID: %d | 到期: %s | 原因: %s | 备注: %s", i+1, row.UserID, domain.FormatExpiryDisplay(row.ExpiresAt), reason, note))
+		fmt.Fprintf(&b, "\n%d. 用户ID: %d | 到期: %s | 原因: %s | 备注: %s", i+1, row.UserID, domain.FormatExpiryDisplay(row.ExpiresAt), reason, note)
 	}
-	a.reply(ctx, msg.Chat.ID, threadPtr(msg), strings.Join(lines, "\n"), nil)
+	a.reply(ctx, msg.Chat.ID, threadPtr(msg), b.String(), nil)
 }
 
 func (a *App) banInfoCmd(ctx context.Context, update telego.Update, args []string) {
@@ -361,67 +429,93 @@ func (a *App) unbanCmd(ctx context.Context, update telego.Update, args []string)
 	}
 }
 
+var ruleSubcommands = map[string]func(a *App, ctx context.Context, update telego.Update, sub string, args []string){
+	"list": (*App).ruleList,
+	"add":  (*App).ruleAdd,
+	"on":   (*App).ruleToggle,
+	"off":  (*App).ruleToggle,
+	"del":  (*App).ruleToggle,
+	"test": (*App).ruleTest,
+}
+
 func (a *App) ruleCmd(ctx context.Context, update telego.Update, args []string) {
 	msg := update.Message
 	if msg == nil || !a.isAdminCommandContext(update) {
 		a.noPerm(ctx, msg)
 		return
 	}
-	if len(args) == 0 || args[0] == "list" {
-		rules, _ := a.Store.ListAutoReplyRules(ctx, 50)
-		if len(rules) == 0 {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), "暂无自动回复规则。", nil)
-			return
-		}
-		lines := []string{"自动回复规则："}
-		for _, r := range rules {
-			status := "停用"
-			if r.IsEnabled {
-				status = "启用"
-			}
-			lines = append(lines, fmt.Sprintf("#%d [%s] [%s] %s => %s", r.ID, status, r.TriggerType, r.TriggerText, r.ReplyText))
-		}
-		if len(strings.Join(lines, "\n")) > 3900 {
-			lines = lines[:20]
-		}
-		a.reply(ctx, msg.Chat.ID, threadPtr(msg), strings.Join(lines, "\n"), nil)
+	sub := "list"
+	if len(args) > 0 {
+		sub = strings.ToLower(args[0])
+		args = args[1:]
+	}
+	handler, ok := ruleSubcommands[sub]
+	if !ok {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/rule list|add|on|off|del|test", nil)
 		return
 	}
-	switch args[0] {
-	case "add":
-		type_, trigger, reply, ok := domain.ParseRuleAddPayload(strings.Join(args[1:], " "))
-		if !ok {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/rule add <精确|包含|前缀|正则> <触发词> => <回复内容>", nil)
-			return
-		}
-		id, _ := a.Store.AddAutoReplyRule(ctx, type_, trigger, reply, 100, a.adminChatID(update))
-		a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("已添加规则 #%d。", id), nil)
-	case "on", "off", "del":
-		if len(args) < 2 {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/rule on|off|del <规则ID>", nil)
-			return
-		}
-		id, _ := strconv.ParseInt(args[1], 10, 64)
-		var ok bool
-		if args[0] == "del" {
-			ok, _ = a.Store.DeleteAutoReplyRule(ctx, id)
-		} else {
-			ok, _ = a.Store.SetAutoReplyRuleEnabled(ctx, id, args[0] == "on")
-		}
-		if ok {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), "操作完成。", nil)
-		} else {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), "规则不存在。", nil)
-		}
-	case "test":
-		rule, _ := a.Store.MatchAutoReplyRule(ctx, strings.Join(args[1:], " "))
-		if rule == nil {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), "未匹配规则。", nil)
-		} else {
-			a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("匹配规则 #%d，回复：%s", rule.ID, rule.ReplyText), nil)
+	handler(a, ctx, update, sub, args)
+}
+
+func (a *App) ruleList(ctx context.Context, update telego.Update, _ string, _ []string) {
+	msg := update.Message
+	rules, _ := a.Store.ListAutoReplyRules(ctx, 50)
+	if len(rules) == 0 {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "暂无自动回复规则。", nil)
+		return
+	}
+	lines := []string{"自动回复规则："}
+	for _, r := range rules {
+		status := "停用"
+		if r.IsEnabled {
+			status = "启用"
 		}
-	default:
-		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/rule list|add|on|off|del|test", nil)
+		lines = append(lines, fmt.Sprintf("#%d [%s] [%s] %s => %s", r.ID, status, r.TriggerType, r.TriggerText, r.ReplyText))
+	}
+	if len(strings.Join(lines, "\n")) > 3900 {
+		lines = lines[:20]
+	}
+	a.reply(ctx, msg.Chat.ID, threadPtr(msg), strings.Join(lines, "\n"), nil)
+}
+
+func (a *App) ruleAdd(ctx context.Context, update telego.Update, _ string, args []string) {
+	msg := update.Message
+	type_, trigger, reply, ok := domain.ParseRuleAddPayload(strings.Join(args, " "))
+	if !ok {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/rule add <精确|包含|前缀|正则> <触发词> => <回复内容>", nil)
+		return
+	}
+	id, _ := a.Store.AddAutoReplyRule(ctx, type_, trigger, reply, 100, a.adminChatID(update))
+	a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("已添加规则 #%d。", id), nil)
+}
+
+func (a *App) ruleToggle(ctx context.Context, update telego.Update, sub string, args []string) {
+	msg := update.Message
+	if len(args) < 1 {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/rule on|off|del <规则ID>", nil)
+		return
+	}
+	id, _ := parseInt64Arg(args[0])
+	var ok bool
+	if sub == "del" {
+		ok, _ = a.Store.DeleteAutoReplyRule(ctx, id)
+	} else {
+		ok, _ = a.Store.SetAutoReplyRuleEnabled(ctx, id, sub == "on")
+	}
+	if ok {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "操作完成。", nil)
+	} else {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "规则不存在。", nil)
+	}
+}
+
+func (a *App) ruleTest(ctx context.Context, update telego.Update, _ string, args []string) {
+	msg := update.Message
+	rule, _ := a.Store.MatchAutoReplyRule(ctx, strings.Join(args, " "))
+	if rule == nil {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "未匹配规则。", nil)
+	} else {
+		a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("匹配规则 #%d，回复：%s", rule.ID, rule.ReplyText), nil)
 	}
 }
 
@@ -471,42 +565,91 @@ func (a *App) broadcastCmd(ctx context.Context, update telego.Update, args []str
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "用法：/broadcast <文本>，或回复一条消息后 /broadcast", nil)
 		return
 	}
-	users, err := a.Store.GetAllUsers(ctx, nil)
+	users, err := a.Store.GetAllUsers(ctx, a.Cfg.AdminChatIDs)
 	if err != nil {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), "读取用户列表失败。", nil)
 		return
 	}
+	text := strings.Join(args, " ")
+	a.broadcastWG.Add(1)
+	go func() {
+		defer a.broadcastWG.Done()
+		a.runBroadcast(ctx, msg, users, text)
+	}()
+}
+
+// runBroadcast sends to every user off the update worker. Sending stops when
+// ctx is cancelled; the results recorded so far are still saved and reported.
+func (a *App) runBroadcast(ctx context.Context, msg *telego.Message, users []int64, text string) {
+	var pace <-chan time.Time
+	if a.Cfg.BroadcastDelay > 0 {
+		ticker := time.NewTicker(a.Cfg.BroadcastDelay)
+		defer ticker.Stop()
+		pace = ticker.C
+	}
+	sem := make(chan struct{}, a.Cfg.BroadcastConcurrency)
+	var wg sync.WaitGroup
+	var resultsMu sync.Mutex
+	var mappings []store.MessageMap
+	var audits []store.AuditEvent
 	success, failed := 0, 0
-	for _, uid := range users {
-		if a.Cfg.IsAdmin(uid) {
-			continue
-		}
-		var sentID int
-		var err error
-		if msg.ReplyToMessage != nil {
-			sentID, err = a.Client.CopyMessage(ctx, telegramx.CopyMessageRequest{ChatID: uid, FromChatID: msg.Chat.ID, MessageID: msg.ReplyToMessage.MessageID})
-			if err == nil {
-				_ = a.Store.SaveMapping(ctx, store.MessageMap{UserChatID: uid, AdminChatID: msg.Chat.ID, UserMessageID: sentID, AdminMessageID: msg.ReplyToMessage.MessageID, Direction: "broadcast"})
+	for i, uid := range users {
+		if i > 0 && pace != nil {
+			select {
+			case <-pace:
+			case <-ctx.Done():
 			}
-		} else {
-			sentID, err = a.Client.SendMessage(ctx, telegramx.SendMessageRequest{ChatID: uid, Text: strings.Join(args, " ")})
-			_ = sentID
-		}
-		outcome := "success"
-		if err != nil {
-			failed++
-			outcome = "failed"
-		} else {
-			success++
 		}
-		_ = a.Store.RecordAuditEvent(ctx, store.AuditEvent{EventType: "broadcast_out", UserID: &uid, AdminChatID: &msg.Chat.ID, Outcome: outcome, Direction: strPtr("broadcast")})
-		if a.Cfg.BroadcastDelaySeconds > 0 {
-			time.Sleep(time.Duration(a.Cfg.BroadcastDelaySeconds * float64(time.Second)))
+		if ctx.Err() != nil {
+			break
 		}
+		sem <- struct{}{}
+		wg.Add(1)
+		go func(uid int64) {
+			defer wg.Done()
+			defer func() { <-sem }()
+			var sentID int
+			var err error
+			if msg.ReplyToMessage != nil {
+				sentID, err = a.Client.CopyMessage(ctx, telegramx.CopyMessageRequest{ChatID: uid, FromChatID: msg.Chat.ID, MessageID: msg.ReplyToMessage.MessageID})
+			} else {
+				_, err = a.Client.SendMessage(ctx, telegramx.SendMessageRequest{ChatID: uid, Text: text})
+			}
+			outcome := "success"
+			var batch []store.MessageMap
+			resultsMu.Lock()
+			if err != nil {
+				failed++
+				outcome = "failed"
+			} else {
+				success++
+				if msg.ReplyToMessage != nil {
+					mappings = append(mappings, store.MessageMap{UserChatID: uid, AdminChatID: msg.Chat.ID, UserMessageID: sentID, AdminMessageID: msg.ReplyToMessage.MessageID, Direction: "broadcast"})
+					if len(mappings) >= broadcastSaveBatch {
+						batch, mappings = mappings, nil
+					}
+				}
+			}
+			audits = append(audits, store.AuditEvent{EventType: "broadcast_out", UserID: &uid, AdminChatID: &msg.Chat.ID, Outcome: outcome, Direction: strPtr("broadcast")})
+			resultsMu.Unlock()
+			if batch != nil {
+				a.saveBroadcastMappings(ctx, batch)
+			}
+		}(uid)
 	}
+	wg.Wait()
+	ctx = context.WithoutCancel(ctx)
+	a.saveBroadcastMappings(ctx, mappings)
+	_ = a.Store.RecordAuditEvents(ctx, audits)
 	a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("广播完成。成功：%d，失败：%d", success, failed), nil)
 }
 
+func (a *App) saveBroadcastMappings(ctx context.Context, maps []store.MessageMap) {
+	if err := a.Store.SaveMappings(ctx, maps); err != nil {
+		log.Printf("save broadcast mappings failed: count=%d err=%v", len(maps), err)
+	}
+}
+
 func (a *App) deletePairCmd(ctx context.Context, update telego.Update, args []string) {
 	msg := update.Message
 	if msg == nil || !a.isAdminCommandContext(update) {
@@ -515,7 +658,9 @@ func (a *App) deletePairCmd(ctx context.Context, update telego.Update, args []st
 	}
 	adminMsgID := 0
 	if len(args) > 0 {
-		adminMsgID, _ = strconv.Atoi(args[0])
+		if id, err := parseInt64Arg(args[0]); err == nil {
+			adminMsgID = int(id)
+		}
 	}
 	if adminMsgID == 0 && msg.ReplyToMessage != nil {
 		adminMsgID = msg.ReplyToMessage.MessageID
@@ -525,14 +670,53 @@ func (a *App) deletePairCmd(ctx context.Context, update telego.Update, args []st
 		return
 	}
 	maps, _ := a.Store.GetMapsByAdminMessage(ctx, msg.Chat.ID, adminMsgID)
-	for _, m := range maps {
-		_ = a.Client.DeleteMessage(ctx, m.AdminChatID, m.AdminMessageID)
-		_ = a.Client.DeleteMessage(ctx, m.UserChatID, m.UserMessageID)
-	}
+	a.deleteMappedMessages(ctx, maps)
 	deleted, _ := a.Store.DeleteMappingsByAdminMessage(ctx, msg.Chat.ID, adminMsgID)
 	a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("已删除映射记录：%d", deleted), nil)
 }
 
+type messageRef struct {
+	chatID    int64
+	messageID int
+}
+
+// deleteMappedMessages deletes both sides of every mapping concurrently and
+// reports how many Telegram deletions succeeded and failed.
+func (a *App) deleteMappedMessages(ctx context.Context, maps []store.MessageMap) (deleted, failed int) {
+	var (
+		wg  sync.WaitGroup
+		mu  sync.Mutex
+		sem = make(chan struct{}, deleteConcurrency)
+	)
+	remove := func(chatID int64, messageID int) {
+		defer wg.Done()
+		defer func() { <-sem }()
+		err := a.Client.DeleteMessage(ctx, chatID, messageID)
+		mu.Lock()
+		if err != nil {
+			failed++
+		} else {
+			deleted++
+		}
+		mu.Unlock()
+	}
+	// Mappings of one admin message share its admin side; delete it once.
+	seen := make(map[messageRef]bool, len(maps)+1)
+	for _, m := range maps {
+		for _, target := range [2]messageRef{{m.AdminChatID, m.AdminMessageID}, {m.UserChatID, m.UserMessageID}} {
+			if seen[target] {
+				continue
+			}
+			seen[target] = true
+			sem <- struct{}{}
+			wg.Add(1)
+			go remove(target.chatID, target.messageID)
+		}
+	}
+	wg.Wait()
+	return deleted, failed
+}
+
 func (a *App) handlePrivateUserMessage(ctx context.Context, update telego.Update) {
 	msg := update.Message
 	if msg == nil || msg.From == nil {
@@ -554,31 +738,51 @@ func (a *App) handlePrivateUserMessage(ctx context.Context, update telego.Update
 			return
 		}
 	}
+	if a.collectAlbum(ctx, msg, a.relayUserAlbum) {
+		return
+	}
 	if a.Cfg.RelayMode == config.RelayModeGroupTopic {
-		a.relayUserToTopic(ctx, msg)
+		a.relayUserToTopic(ctx, msg, kind)
 		return
 	}
+	kb := adminActionKeyboard(userID, nil)
+	var (
+		wg     sync.WaitGroup
+		mu     sync.Mutex
+		maps   = make([]store.MessageMap, 0, len(a.Cfg.AdminChatIDs))
+		events = make([]store.AuditEvent, 0, len(a.Cfg.AdminChatIDs))
+	)
 	for _, adminID := range a.Cfg.AdminChatIDs {
-		kb := adminActionKeyboard(userID, nil)
-		sentID, err := a.Client.CopyMessage(ctx, telegramx.CopyMessageRequest{ChatID: adminID, FromChatID: msg.Chat.ID, MessageID: msg.MessageID, ReplyMarkup: &kb})
-		outcome := "success"
-		if err != nil {
-			outcome = "failed"
-			log.Printf("copy user message to admin failed: user=%d admin=%d err=%v", userID, adminID, err)
-		} else {
-			_ = a.Store.SaveMapping(ctx, store.MessageMap{UserChatID: userID, AdminChatID: adminID, UserMessageID: msg.MessageID, AdminMessageID: sentID, Direction: "user_to_admin"})
-		}
-		_ = a.Store.RecordAuditEvent(ctx, store.AuditEvent{EventType: "forward_user_to_admin", UserID: &userID, AdminChatID: &adminID, ChatID: &msg.Chat.ID, MessageID: &msg.MessageID, MappedMessageID: &sentID, MessageKind: &kind, Direction: strPtr("user_to_admin"), Outcome: outcome})
+		wg.Add(1)
+		go func(adminID int64) {
+			defer wg.Done()
+			sentID, err := a.Client.CopyMessage(ctx, telegramx.CopyMessageRequest{ChatID: adminID, FromChatID: msg.Chat.ID, MessageID: msg.MessageID, ReplyMarkup: &kb})
+			outcome := "success"
+			if err != nil {
+				outcome = "failed"
+				log.Printf("copy user message to admin failed: user=%d admin=%d err=%v", userID, adminID, err)
+			}
+			mu.Lock()
+			defer mu.Unlock()
+			if err == nil {
+				maps = append(maps, store.MessageMap{UserChatID: userID, AdminChatID: adminID, UserMessageID: msg.MessageID, AdminMessageID: sentID, Direction: "user_to_admin"})
+			}
+			events = append(events, store.AuditEvent{EventType: "forward_user_to_admin", UserID: &userID, AdminChatID: &adminID, ChatID: &msg.Chat.ID, MessageID: &msg.MessageID, MappedMessageID: &sentID, MessageKind: &kind, Direction: strPtr("user_to_admin"), Outcome: outcome})
+		}(adminID)
+	}
+	wg.Wait()
+	if err := a.Store.SaveMappings(ctx, maps); err != nil {
+		log.Printf("save admin copy mappings failed: count=%d err=%v", len(maps), err)
 	}
+	_ = a.Store.RecordAuditEvents(ctx, events)
 }
 
-func (a *App) relayUserToTopic(ctx context.Context, msg *telego.Message) {
+func (a *App) relayUserToTopic(ctx context.Context, msg *telego.Message, kind string) {
 	if a.Cfg.AdminGroupChatID == nil || msg.From == nil {
 		return
 	}
 	userID := msg.From.ID
 	threadID, err := a.ensureUserTopic(ctx, userID, msg.From.Username, fullName(msg.From))
-	kind := messageKind(msg)
 	if err != nil {
 		log.Printf("ensure topic failed for user=%d err=%v", userID, err)
 		_ = a.Store.RecordAuditEvent(ctx, store.AuditEvent{EventType: "forward_user_to_admin", UserID: &userID, AdminChatID: a.Cfg.AdminGroupChatID, ChatID: &msg.Chat.ID, MessageID: &msg.MessageID, MessageKind: &kind, Direction: strPtr("user_to_admin"), Outcome: "failed", ErrorClass: strPtr("topic")})
@@ -600,6 +804,10 @@ func (a *App) ensureUserTopic(ctx context.Context, userID int64, username, fullN
 	if a.Cfg.AdminGroupChatID == nil {
 		return 0, fmt.Errorf("ADMIN_GROUP_CHAT_ID is not configured")
 	}
+	// Album relays run outside the chat's update worker; serialize per user so
+	// two of them cannot both see no topic and create one each.
+	unlock := a.topicLocks.Lock(userID)
+	defer unlock()
 	expected := domain.BuildUserTopicTitle(username, fullName, userID)
 	topic, err := a.Store.GetUserTopic(ctx, userID)
 	if err != nil {
@@ -622,6 +830,41 @@ func (a *App) ensureUserTopic(ctx context.Context, userID int64, username, fullN
 	return topic.TopicThreadID, nil
 }
 
+// keyedMutex hands out one mutex per key, dropping it once no caller holds
+// or waits on it.
+type keyedMutex struct {
+	mu    sync.Mutex
+	locks map[int64]*keyedLock
+}
+
+type keyedLock struct {
+	sync.Mutex
+	refs int
+}
+
+func (k *keyedMutex) Lock(key int64) (unlock func()) {
+	k.mu.Lock()
+	if k.locks == nil {
+		k.locks = map[int64]*keyedLock{}
+	}
+	l := k.locks[key]
+	if l == nil {
+		l = &keyedLock{}
+		k.locks[key] = l
+	}
+	l.refs++
+	k.mu.Unlock()
+	l.Lock()
+	return func() {
+		l.Unlock()
+		k.mu.Lock()
+		if l.refs--; l.refs == 0 {
+			delete(k.locks, key)
+		}
+		k.mu.Unlock()
+	}
+}
+
 func (a *App) handleAdminMessage(ctx context.Context, update telego.Update) {
 	msg := regularMessage(&update)
 	if msg == nil {
@@ -637,6 +880,11 @@ func (a *App) handleAdminMessage(ctx context.Context, update telego.Update) {
 		a.reply(ctx, msg.Chat.ID, threadPtr(msg), fmt.Sprintf("用户 %d 已封禁，不能发送。", *target), nil)
 		return
 	}
+	if a.collectAlbum(ctx, msg, func(ctx context.Context, msgs []*telego.Message) {
+		a.copyAdminAlbum(ctx, msgs, *target, "forward_admin_to_user")
+	}) {
+		return
+	}
 	sentID, err := a.Client.CopyMessage(ctx, telegramx.CopyMessageRequest{ChatID: *target, FromChatID: msg.Chat.ID, MessageID: msg.MessageID})
 	kind := messageKind(msg)
 	outcome := "success"
@@ -651,7 +899,7 @@ func (a *App) handleAdminMessage(ctx context.Context, update telego.Update) {
 
 func (a *App) handleGroupTopicMessage(ctx context.Context, update telego.Update) {
 	msg := regularMessage(&update)
-	if msg == nil || a.Cfg.RelayMode != config.RelayModeGroupTopic || a.Cfg.AdminGroupChatID == nil || msg.Chat.ID != *a.Cfg.AdminGroupChatID {
+	if msg == nil || !a.Cfg.IsAdminGroupChat(msg.Chat.ID) {
 		return
 	}
 	if isServiceMessage(msg) || telegramx.IsCommandLike(msg.Text, msg.Caption) {
@@ -669,6 +917,11 @@ func (a *App) handleGroupTopicMessage(ctx context.Context, update telego.Update)
 	if banned {
 		return
 	}
+	if a.collectAlbum(ctx, msg, func(ctx context.Context, msgs []*telego.Message) {
+		a.copyAdminAlbum(ctx, msgs, *target, "forward_group_topic_to_user")
+	}) {
+		return
+	}
 	sentID, err := a.Client.CopyMessage(ctx, telegramx.CopyMessageRequest{ChatID: *target, FromChatID: msg.Chat.ID, MessageID: msg.MessageID})
 	kind := messageKind(msg)
 	outcome := "success"
@@ -710,8 +963,10 @@ func (a *App) resolveAdminTarget(ctx context.Context, update telego.Update) (*in
 			return target, err
 		}
 	}
-	if target, err := a.resolveGroupTopicTarget(ctx, update); err != nil || target != nil {
-		return target, err
+	if a.Cfg.IsAdminGroupChat(msg.Chat.ID) {
+		if target, err := a.resolveGroupTopicTarget(ctx, update); err != nil || target != nil {
+			return target, err
+		}
 	}
 	adminChatID := a.adminChatID(update)
 	if adminChatID == 0 {
@@ -725,37 +980,68 @@ func (a *App) handleEditedMessage(ctx context.Context, update telego.Update) {
 	if msg == nil {
 		return
 	}
-	if msg.Chat.Type == telego.ChatTypePrivate && msg.From != nil && !a.Cfg.IsAdmin(msg.From.ID) {
-		maps, _ := a.Store.GetUserToAdminMaps(ctx, msg.Chat.ID, msg.MessageID)
-		for _, m := range maps {
-			a.syncEdit(ctx, msg, m.AdminChatID, m.AdminMessageID, "edit_sync_user_to_admin", &m.UserChatID)
-		}
+	if a.Cfg.IsAdminGroupChat(msg.Chat.ID) && telegramx.IsCommandLike(msg.Text, msg.Caption) {
 		return
 	}
-	if a.Cfg.RelayMode == config.RelayModeGroupTopic && a.Cfg.AdminGroupChatID != nil && msg.Chat.ID == *a.Cfg.AdminGroupChatID && telegramx.IsCommandLike(msg.Text, msg.Caption) {
+	edit := editSyncFunc(a.Client, msg)
+	if edit == nil {
 		return
 	}
-	maps, _ := a.Store.GetAdminToUserMaps(ctx, msg.Chat.ID, msg.MessageID)
-	for _, m := range maps {
-		a.syncEdit(ctx, msg, m.UserChatID, m.UserMessageID, "edit_sync_admin_to_user", &m.UserChatID)
+	maps, _ := a.Store.GetLinkedMaps(ctx, msg.Chat.ID, msg.MessageID)
+	if len(maps) == 0 {
+		return
 	}
-}
-
-func (a *App) syncEdit(ctx context.Context, msg *telego.Message, targetChatID int64, targetMessageID int, eventType string, userID *int64) {
 	kind := messageKind(msg)
-	outcome := "success"
-	var err error
-	if msg.Text != "" {
-		err = a.Client.EditMessageText(ctx, telegramx.EditTextRequest{ChatID: targetChatID, MessageID: targetMessageID, Text: msg.Text, Entities: msg.Entities})
-	} else if msg.Caption != "" {
-		err = a.Client.EditMessageCaption(ctx, telegramx.EditCaptionRequest{ChatID: targetChatID, MessageID: targetMessageID, Caption: msg.Caption, Entities: msg.CaptionEntities})
-	} else {
-		outcome = "skipped"
+	events := make([]store.AuditEvent, len(maps))
+	var wg sync.WaitGroup
+	sem := make(chan struct{}, editSyncConcurrency)
+	for i, m := range maps {
+		route := editSyncRoutes[m.Direction]
+		targetChatID, targetMessageID := m.UserChatID, m.UserMessageID
+		if route.toAdmin {
+			targetChatID, targetMessageID = m.AdminChatID, m.AdminMessageID
+		}
+		events[i] = store.AuditEvent{EventType: route.event, UserID: &maps[i].UserChatID, ChatID: &msg.Chat.ID, MessageID: &msg.MessageID, MappedMessageID: &targetMessageID, MessageKind: &kind, IsEdited: true}
+		sem <- struct{}{}
+		wg.Add(1)
+		go func(event *store.AuditEvent, chatID int64, messageID int) {
+			defer wg.Done()
+			defer func() { <-sem }()
+			event.Outcome = "success"
+			if err := edit(ctx, chatID, messageID); err != nil {
+				event.Outcome = "failed"
+			}
+		}(&events[i], targetChatID, targetMessageID)
 	}
-	if err != nil {
-		outcome = "failed"
+	wg.Wait()
+	_ = a.Store.RecordAuditEvents(ctx, events)
+}
+
+// editSyncRoutes maps a mapping's direction to the side an edit is copied to
+// and the audit event recorded for it.
+var editSyncRoutes = map[string]struct {
+	event   string
+	toAdmin bool
+}{
+	"user_to_admin": {event: "edit_sync_user_to_admin", toAdmin: true},
+	"admin_to_user": {event: "edit_sync_admin_to_user"},
+	"broadcast":     {event: "edit_sync_admin_to_user"},
+}
+
+// editSyncFunc returns the call that mirrors msg's new text or caption onto a
+// mapped message, or nil when the edit has neither.
+func editSyncFunc(client telegramx.Client, msg *telego.Message) func(ctx context.Context, chatID int64, messageID int) error {
+	switch {
+	case msg.Text != "":
+		return func(ctx context.Context, chatID int64, messageID int) error {
+			return client.EditMessageText(ctx, telegramx.EditTextRequest{ChatID: chatID, MessageID: messageID, Text: msg.Text, Entities: msg.Entities})
+		}
+	case msg.Caption != "":
+		return func(ctx context.Context, chatID int64, messageID int) error {
+			return client.EditMessageCaption(ctx, telegramx.EditCaptionRequest{ChatID: chatID, MessageID: messageID, Caption: msg.Caption, Entities: msg.CaptionEntities})
+		}
 	}
-	_ = a.Store.RecordAuditEvent(ctx, store.AuditEvent{EventType: eventType, UserID: userID, ChatID: &msg.Chat.ID, MessageID: &msg.MessageID, MappedMessageID: &targetMessageID, MessageKind: &kind, IsEdited: true, Outcome: outcome})
+	return nil
 }
 
 func (a *App) handleCallback(ctx context.Context, update telego.Update) {
@@ -779,42 +1065,78 @@ func (a *App) handleCallback(ctx context.Context, update telego.Update) {
 		log.Printf("callback message unavailable: data=%s user=%d", data, q.From.ID)
 		return
 	}
-	if strings.HasPrefix(data, "uid:") {
-		a.callbackReply(ctx, chatID, thread, "用户ID："+strings.TrimPrefix(data, "uid:"))
-		return
-	}
-	if data == "sessclear" {
-		_ = a.Store.SetCurrentSession(ctx, chatID, nil)
-		a.callbackReply(ctx, chatID, thread, "已清空当前会话。")
-		return
-	}
-	if strings.HasPrefix(data, "sess:") {
-		uid, _ := strconv.ParseInt(strings.TrimPrefix(data, "sess:"), 10, 64)
-		_ = a.Store.SetCurrentSession(ctx, chatID, &uid)
-		a.callbackReply(ctx, chatID, thread, fmt.Sprintf("当前会话已切换到用户：%d", uid))
+	head, arg, _ := strings.Cut(data, ":")
+	handler, ok := callbackHandlers[head]
+	if !ok {
 		return
 	}
-	if strings.HasPrefix(data, "ban:") || strings.HasPrefix(data, "unban:") {
-		parts := strings.SplitN(data, ":", 2)
-		uid, _ := strconv.ParseInt(parts[1], 10, 64)
-		if parts[0] == "ban" {
-			_ = a.Store.BanUser(ctx, uid, q.From.ID, nil, nil, nil)
-			a.callbackReply(ctx, chatID, thread, fmt.Sprintf("用户 %d 已封禁。", uid))
-		} else {
-			_, _ = a.Store.UnbanUser(ctx, uid)
-			a.callbackReply(ctx, chatID, thread, fmt.Sprintf("用户 %d 已解封。", uid))
+	cb := callbackContext{query: q, msg: msg, chatID: chatID, thread: thread, arg: arg}
+	if handler.userArg {
+		uid, err := parseInt64Arg(arg)
+		if err != nil {
+			log.Printf("malformed callback data: data=%s user=%d", data, q.From.ID)
+			return
 		}
-		return
-	}
-	if strings.HasPrefix(data, "do:") {
-		a.callbackReply(ctx, chatID, thread, "请使用对应 / 命令继续操作。")
-		return
-	}
-	if strings.HasPrefix(data, "ask:") {
-		a.setPending(q.From.ID, strings.TrimPrefix(data, "ask:"), chatID)
-		a.callbackReply(ctx, chatID, thread, guidedPrompt(strings.TrimPrefix(data, "ask:")))
-		return
+		cb.userID = uid
 	}
+	handler.handle(a, ctx, cb)
+}
+
+type callbackContext struct {
+	query  *telego.CallbackQuery
+	msg    *telego.Message
+	chatID int64
+	thread *int
+	arg    string
+	userID int64
+}
+
+// callbackHandlers is keyed by the callback data up to the first ':'; userArg
+// handlers receive the remainder parsed as a user ID.
+var callbackHandlers = map[string]struct {
+	userArg bool
+	handle  func(a *App, ctx context.Context, cb callbackContext)
+}{
+	"sessclear": {handle: (*App).callbackSessionClear},
+	"uid":       {userArg: true, handle: (*App).callbackUserID},
+	"sess":      {userArg: true, handle: (*App).callbackSession},
+	"ban":       {userArg: true, handle: (*App).callbackBan},
+	"unban":     {userArg: true, handle: (*App).callbackUnban},
+	"do":        {handle: (*App).callbackDo},
+	"ask":       {handle: (*App).callbackAsk},
+}
+
+func (a *App) callbackSessionClear(ctx context.Context, cb callbackContext) {
+	_ = a.Store.SetCurrentSession(ctx, cb.chatID, nil)
+	a.callbackReply(ctx, cb.chatID, cb.thread, "已清空当前会话。")
+}
+
+func (a *App) callbackUserID(ctx context.Context, cb callbackContext) {
+	a.callbackReply(ctx, cb.chatID, cb.thread, "用户ID："+cb.arg)
+}
+
+func (a *App) callbackSession(ctx context.Context, cb callbackContext) {
+	_ = a.Store.SetCurrentSession(ctx, cb.chatID, &cb.userID)
+	a.callbackReply(ctx, cb.chatID, cb.thread, fmt.Sprintf("当前会话已切换到用户：%d", cb.userID))
+}
+
+func (a *App) callbackBan(ctx context.Context, cb callbackContext) {
+	_ = a.Store.BanUser(ctx, cb.userID, cb.query.From.ID, nil, nil, nil)
+	a.callbackReply(ctx, cb.chatID, cb.thread, fmt.Sprintf("用户 %d 已封禁。", cb.userID))
+}
+
+func (a *App) callbackUnban(ctx context.Context, cb callbackContext) {
+	_, _ = a.Store.UnbanUser(ctx, cb.userID)
+	a.callbackReply(ctx, cb.chatID, cb.thread, fmt.Sprintf("用户 %d 已解封。", cb.userID))
+}
+
+func (a *App) callbackDo(ctx context.Context, cb callbackContext) {
+	a.callbackReply(ctx, cb.chatID, cb.thread, "请使用对应 / 命令继续操作。")
+}
+
+func (a *App) callbackAsk(ctx context.Context, cb callbackContext) {
+	a.setPending(cb.query.From.ID, cb.arg, cb.chatID)
+	a.callbackReply(ctx, cb.chatID, cb.thread, guidedPrompt(cb.arg))
 }
 
 func (a *App) callbackReply(ctx context.Context, chatID int64, thread *int, text string) {
@@ -872,32 +1194,24 @@ func (a *App) noPerm(ctx context.Context, msg *telego.Message) {
 }
 
 func (a *App) isAdminCommandContext(update telego.Update) bool {
-	msg := regularMessage(&update)
-	if msg == nil || msg.From == nil || !a.Cfg.IsAdmin(msg.From.ID) {
-		return false
-	}
-	if a.Cfg.IsAdminPrivateChat(msg.Chat.ID) {
-		return true
-	}
-	return a.Cfg.RelayMode == config.RelayModeGroupTopic && a.Cfg.AdminGroupChatID != nil && msg.Chat.ID == *a.Cfg.AdminGroupChatID
+	return a.adminChatID(update) != 0
 }
 
+// adminChatID returns the chat an admin command was issued from, or 0 when the
+// sender is not an admin or the chat is not an admin context.
 func (a *App) adminChatID(update telego.Update) int64 {
 	msg := regularMessage(&update)
 	if msg == nil || msg.From == nil || !a.Cfg.IsAdmin(msg.From.ID) {
 		return 0
 	}
-	if a.Cfg.IsAdminPrivateChat(msg.Chat.ID) {
-		return msg.Chat.ID
-	}
-	if a.Cfg.RelayMode == config.RelayModeGroupTopic && a.Cfg.AdminGroupChatID != nil && msg.Chat.ID == *a.Cfg.AdminGroupChatID {
+	if a.Cfg.IsAdminPrivateChat(msg.Chat.ID) || a.Cfg.IsAdminGroupChat(msg.Chat.ID) {
 		return msg.Chat.ID
 	}
 	return 0
 }
 
 func (a *App) targetFromArgOrReply(ctx context.Context, update telego.Update, args []string) (*int64, []string) {
-	if len(args) > 0 {
+	if len(args) > 0 && isIntegerArg(args[0]) {
 		if uid, err := strconv.ParseInt(args[0], 10, 64); err == nil {
 			return &uid, args[1:]
 		}
@@ -962,11 +1276,34 @@ func fullName(user *telego.User) string {
 	if user == nil {
 		return ""
 	}
-	name := strings.TrimSpace(strings.TrimSpace(user.FirstName) + " " + strings.TrimSpace(user.LastName))
-	if name == "" {
-		name = strconv.FormatInt(user.ID, 10)
+	first, last := strings.TrimSpace(user.FirstName), strings.TrimSpace(user.LastName)
+	switch {
+	case last == "" && first == "":
+		return strconv.FormatInt(user.ID, 10)
+	case last == "":
+		return first
+	case first == "":
+		return last
+	}
+	return first + " " + last
+}
+
+func updateChatID(update telego.Update) int64 {
+	if msg := regularMessage(&update); msg != nil {
+		return msg.Chat.ID
+	}
+	if msg := editedRegularMessage(&update); msg != nil {
+		return msg.Chat.ID
+	}
+	if q := update.CallbackQuery; q != nil {
+		if q.Message != nil {
+			if msg := q.Message.Message(); msg != nil {
+				return msg.Chat.ID
+			}
+		}
+		return q.From.ID
 	}
-	return name
+	return 0
 }
 
 func effectiveUserID(update telego.Update) int64 {
@@ -986,39 +1323,30 @@ func threadPtr(msg *telego.Message) *int {
 	return &msg.MessageThreadID
 }
 
+var messageKinds = [...]struct {
+	kind string
+	has  func(*telego.Message) bool
+}{
+	{"text", func(m *telego.Message) bool { return m.Text != "" }},
+	{"photo", func(m *telego.Message) bool { return len(m.Photo) > 0 }},
+	{"video", func(m *telego.Message) bool { return m.Video != nil }},
+	{"document", func(m *telego.Message) bool { return m.Document != nil }},
+	{"audio", func(m *telego.Message) bool { return m.Audio != nil }},
+	{"voice", func(m *telego.Message) bool { return m.Voice != nil }},
+	{"sticker", func(m *telego.Message) bool { return m.Sticker != nil }},
+	{"animation", func(m *telego.Message) bool { return m.Animation != nil }},
+	{"location", func(m *telego.Message) bool { return m.Location != nil }},
+	{"contact", func(m *telego.Message) bool { return m.Contact != nil }},
+}
+
 func messageKind(message *telego.Message) string {
 	if message == nil {
 		return "other"
 	}
-	if message.Text != "" {
-		return "text"
-	}
-	if len(message.Photo) > 0 {
-		return "photo"
-	}
-	if message.Video != nil {
-		return "video"
-	}
-	if message.Document != nil {
-		return "document"
-	}
-	if message.Audio != nil {
-		return "audio"
-	}
-	if message.Voice != nil {
-		return "voice"
-	}
-	if message.Sticker != nil {
-		return "sticker"
-	}
-	if message.Animation != nil {
-		return "animation"
-	}
-	if message.Location != nil {
-		return "location"
-	}
-	if message.Contact != nil {
-		return "contact"
+	for _, k := range messageKinds {
+		if k.has(message) {
+			return k.kind
+		}
 	}
 	return "other"
 }
@@ -1069,18 +1397,45 @@ func updateLogMeta(update telego.Update) string {
 	return fmt.Sprintf("update=%d fields=%s chat=%d chat_type=%s user=%d message=%d thread=%d reply_to=%d", update.UpdateID, strings.Join(fields, ","), chatID, chatType, effectiveUserID(update), msgID, threadID, replyID)
 }
 
+// keyboardTemplate holds button labels and callback data; entries ending in
+// ':' get the user ID appended when the keyboard is built.
+type keyboardTemplate [][]struct{ text, data string }
+
+var adminActionRows = keyboardTemplate{
+	{{"封禁用户", "ban:"}, {"解封用户", "unban:"}, {"设为会话", "sess:"}},
+	{{"清空会话", "sessclear"}, {"用户ID", "uid:"}},
+}
+
+// actionKeyboards memoizes the per-user keyboard attached to every relayed
+// message; entries are shared and must not be modified.
+var actionKeyboards = cache.NewLRU[int64, telegramx.InlineKeyboard](4096, 0)
+
 func adminActionKeyboard(userID int64, adminMessageID *int) telegramx.InlineKeyboard {
-	banData := fmt.Sprintf("ban:%d", userID)
-	if adminMessageID != nil {
-		banData = fmt.Sprintf("banmenu:%d:%d", userID, *adminMessageID)
+	if adminMessageID == nil {
+		if kb, ok := actionKeyboards.Get(userID); ok {
+			return kb
+		}
 	}
-	rows := telegramx.InlineKeyboard{
-		{{Text: "封禁用户", Data: banData}, {Text: "解封用户", Data: fmt.Sprintf("unban:%d", userID)}, {Text: "设为会话", Data: fmt.Sprintf("sess:%d", userID)}},
-		{{Text: "清空会话", Data: "sessclear"}, {Text: "用户ID", Data: fmt.Sprintf("uid:%d", userID)}},
+	uid := strconv.FormatInt(userID, 10)
+	rows := make(telegramx.InlineKeyboard, len(adminActionRows), len(adminActionRows)+1)
+	for i, tmpl := range adminActionRows {
+		row := make([]telegramx.Button, len(tmpl))
+		for j, b := range tmpl {
+			data := b.data
+			if strings.HasSuffix(data, ":") {
+				data += uid
+			}
+			row[j] = telegramx.Button{Text: b.text, Data: data}
+		}
+		rows[i] = row
 	}
 	if adminMessageID != nil {
-		rows = append(rows, []telegramx.Button{{Text: "删除消息", Data: fmt.Sprintf("delpair:%d", *adminMessageID)}})
+		mid := strconv.Itoa(*adminMessageID)
+		rows[0][0].Data = "banmenu:" + uid + ":" + mid
+		rows = append(rows, []telegramx.Button{{Text: "删除消息", Data: "delpair:" + mid}})
+		return rows
 	}
+	actionKeyboards.Add(userID, rows)
 	return rows
 }
 
@@ -1123,24 +1478,28 @@ func startCommandsKeyboard(commands []config.Command, isAdmin bool) telegramx.In
 	return rows
 }
 
+var guidedPrompts = map[string]string{
+	"recent":    "请输入数量 N（1-100），例如：10",
+	"session":   "请输入用户ID，或输入 clear 清空当前会话。",
+	"ban":       "请输入封禁参数：<用户ID> [1h|1d|7d|30d|YYYY-MM-DD] [原因]，备注用 | 分隔。",
+	"baninfo":   "请输入要查询的用户ID。",
+	"unban":     "请输入要解封的用户ID。",
+	"broadcast": "请输入广播内容。",
+	"rule:add":  "请输入：<精确|包含|前缀|正则> <触发词> => <回复内容>",
+	"rule:test": "请输入要测试匹配的文本。",
+}
+
 func guidedPrompt(actionKey string) string {
-	prompts := map[string]string{
-		"recent":    "请输入数量 N（1-100），例如：10",
-		"session":   "请输入用户ID，或输入 clear 清空当前会话。",
-		"ban":       "请输入封禁参数：<用户ID> [1h|1d|7d|30d|YYYY-MM-DD] [原因]，备注用 | 分隔。",
-		"baninfo":   "请输入要查询的用户ID。",
-		"unban":     "请输入要解封的用户ID。",
-		"broadcast": "请输入广播内容。",
-		"rule:add":  "请输入：<精确|包含|前缀|正则> <触发词> => <回复内容>",
-		"rule:test": "请输入要测试匹配的文本。",
-	}
-	return fallback(prompts[actionKey], "请输入参数。")
+	return fallback(guidedPrompts[actionKey], "请输入参数。")
 }
 
 func parseLimit(args []string, def, min, max int) int {
 	if len(args) == 0 {
 		return def
 	}
+	if !isIntegerArg(args[0]) {
+		return def
+	}
 	value, err := strconv.Atoi(args[0])
 	if err != nil {
 		return def
@@ -1154,6 +1513,32 @@ func parseLimit(args []string, def, min, max int) int {
 	return value
 }
 
+var errNotInteger = errors.New("not an integer")
+
+// isIntegerArg reports whether s looks like a base-10 integer, so callers can
+// skip strconv (and its *NumError allocation) for plain-text arguments.
+func isIntegerArg(s string) bool {
+	if s != "" && s[0] == '-' {
+		s = s[1:]
+	}
+	if s == "" {
+		return false
+	}
+	for i := 0; i < len(s); i++ {
+		if s[i] < '0' || s[i] > '9' {
+			return false
+		}
+	}
+	return true
+}
+
+func parseInt64Arg(s string) (int64, error) {
+	if !isIntegerArg(s) {
+		return 0, errNotInteger
+	}
+	return strconv.ParseInt(s, 10, 64)
+}
+
 func firstArg(args []string, def string) string {
 	if len(args) == 0 {
 		return def
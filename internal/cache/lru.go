@@ -0,0 +1,82 @@
+package cache
+
+import (
+	"container/list"
+	"sync"
+	"time"
+)
+
+type LRU[K comparable, V any] struct {
+	mu       sync.Mutex
+	capacity int
+	ttl      time.Duration
+	items    map[K]*list.Element
+	order    *list.List
+}
+
+type entry[K comparable, V any] struct {
+	key     K
+	value   V
+	expires time.Time
+}
+
+// NewLRU returns a cache holding at most capacity entries. A positive ttl
+// also expires entries that long after they were last added.
+func NewLRU[K comparable, V any](capacity int, ttl time.Duration) *LRU[K, V] {
+	return &LRU[K, V]{capacity: capacity, ttl: ttl, items: make(map[K]*list.Element, capacity), order: list.New()}
+}
+
+func (c *LRU[K, V]) Get(key K) (V, bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	var zero V
+	el, ok := c.items[key]
+	if !ok {
+		return zero, false
+	}
+	e := el.Value.(*entry[K, V])
+	if c.ttl > 0 && time.Now().After(e.expires) {
+		c.order.Remove(el)
+		delete(c.items, key)
+		return zero, false
+	}
+	c.order.MoveToFront(el)
+	return e.value, true
+}
+
+func (c *LRU[K, V]) Add(key K, value V) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	var expires time.Time
+	if c.ttl > 0 {
+		expires = time.Now().Add(c.ttl)
+	}
+	if el, ok := c.items[key]; ok {
+		e := el.Value.(*entry[K, V])
+		e.value, e.expires = value, expires
+		c.order.MoveToFront(el)
+		return
+	}
+	c.items[key] = c.order.PushFront(&entry[K, V]{key: key, value: value, expires: expires})
+	if c.order.Len() > c.capacity {
+		oldest := c.order.Back()
+		c.order.Remove(oldest)
+		delete(c.items, oldest.Value.(*entry[K, V]).key)
+	}
+}
+
+func (c *LRU[K, V]) Remove(key K) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if el, ok := c.items[key]; ok {
+		c.order.Remove(el)
+		delete(c.items, key)
+	}
+}
+
+func (c *LRU[K, V]) Purge() {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	clear(c.items)
+	c.order.Init()
+}
@@ -5,8 +5,7 @@ import (
 	"os"
 	"strconv"
 	"strings"
-
-	"github.com/joho/godotenv"
+	"time"
 )
 
 const (
@@ -35,6 +34,7 @@ type Config struct {
 	AdminGroupGeneralThreadID *int
 	DBPath                    string
 	BroadcastDelaySeconds     float64
+	BroadcastConcurrency      int
 	StartMessage              string
 	BotName                   string
 	BotVersion                string
@@ -42,10 +42,19 @@ type Config struct {
 	BotShortDescription       string
 	BotUserCommands           []Command
 	BotAdminCommands          []Command
+	BotAPIURL                 string
+	WebhookURL                string
+	WebhookListen             string
+	WebhookSecret             string
+
+	// Derived once in Load for the per-update and per-broadcast paths.
+	BroadcastDelay   time.Duration
+	topicGroupChatID int64
+	adminSet         map[int64]struct{}
 }
 
 func Load() (*Config, error) {
-	_ = godotenv.Load()
+	_ = loadDotEnv(".env")
 
 	adminIDs, err := ParseAdminChatIDs(os.Getenv("ADMIN_CHAT_ID"))
 	if err != nil {
@@ -67,6 +76,13 @@ func Load() (*Config, error) {
 	if err != nil {
 		return nil, err
 	}
+	broadcastConcurrency, err := IntEnv("BROADCAST_CONCURRENCY", "20")
+	if err != nil {
+		return nil, err
+	}
+	if broadcastConcurrency < 1 {
+		broadcastConcurrency = 1
+	}
 
 	botVersion := strings.TrimSpace(os.Getenv("BOT_VERSION"))
 	if botVersion == "" {
@@ -83,18 +99,31 @@ func Load() (*Config, error) {
 		AdminGroupGeneralThreadID: generalThreadID,
 		DBPath:                    strings.TrimSpace(envDefault("DB_PATH", "relay_bot.db")),
 		BroadcastDelaySeconds:     broadcastDelay,
+		BroadcastConcurrency:      broadcastConcurrency,
 		StartMessage:              multilineEnv("START_MESSAGE"),
 		BotName:                   strings.TrimSpace(os.Getenv("BOT_NAME")),
 		BotVersion:                botVersion,
 		BotDescription:            multilineEnv("BOT_DESCRIPTION"),
 		BotShortDescription:       multilineEnv("BOT_SHORT_DESCRIPTION"),
 		BotUserCommands:           ParseBotCommands(os.Getenv("BOT_USER_COMMANDS")),
+		BotAPIURL:                 strings.TrimRight(strings.TrimSpace(os.Getenv("BOT_API_URL")), "/"),
+		WebhookURL:                strings.TrimSpace(os.Getenv("WEBHOOK_URL")),
+		WebhookListen:             strings.TrimSpace(envDefault("WEBHOOK_LISTEN", ":8443")),
+		WebhookSecret:             strings.TrimSpace(os.Getenv("WEBHOOK_SECRET")),
 	}
 	adminCommandsRaw := os.Getenv("BOT_ADMIN_COMMANDS")
 	if strings.TrimSpace(adminCommandsRaw) == "" {
 		adminCommandsRaw = os.Getenv("BOT_COMMANDS")
 	}
 	cfg.BotAdminCommands = ParseBotCommands(adminCommandsRaw)
+	cfg.BroadcastDelay = time.Duration(cfg.BroadcastDelaySeconds * float64(time.Second))
+	cfg.adminSet = make(map[int64]struct{}, len(adminIDs))
+	for _, id := range adminIDs {
+		cfg.adminSet[id] = struct{}{}
+	}
+	if cfg.RelayMode == RelayModeGroupTopic && cfg.AdminGroupChatID != nil {
+		cfg.topicGroupChatID = *cfg.AdminGroupChatID
+	}
 
 	if cfg.BotToken == "" {
 		return nil, fmt.Errorf("环境变量 BOT_TOKEN 不能为空")
@@ -102,6 +131,9 @@ func Load() (*Config, error) {
 	if cfg.RelayMode == RelayModeGroupTopic && cfg.AdminGroupChatID == nil {
 		return nil, fmt.Errorf("RELAY_MODE=group_topic 时 ADMIN_GROUP_CHAT_ID 不能为空")
 	}
+	if cfg.WebhookURL != "" && !isWebhookSecret(cfg.WebhookSecret) {
+		return nil, fmt.Errorf("设置 WEBHOOK_URL 时 WEBHOOK_SECRET 必填，且只能包含 1-256 个 A-Z a-z 0-9 _ - 字符")
+	}
 	return cfg, nil
 }
 
@@ -119,14 +151,18 @@ func multilineEnv(name string) string {
 
 func ParseBotCommands(raw string) []Command {
 	commands := make([]Command, 0)
-	for _, item := range strings.Split(raw, ";") {
-		item = strings.TrimSpace(item)
-		if item == "" || !strings.Contains(item, ":") {
+	if !strings.Contains(raw, ":") {
+		return commands
+	}
+	for rest := raw; rest != ""; {
+		var item string
+		item, rest, _ = strings.Cut(rest, ";")
+		name, desc, ok := strings.Cut(item, ":")
+		if !ok {
 			continue
 		}
-		parts := strings.SplitN(item, ":", 2)
-		command := strings.TrimLeft(strings.TrimSpace(parts[0]), "/")
-		desc := strings.TrimSpace(parts[1])
+		command := strings.TrimLeft(strings.TrimSpace(name), "/")
+		desc = strings.TrimSpace(desc)
 		if command != "" && desc != "" {
 			commands = append(commands, Command{Command: command, Description: desc})
 		}
@@ -165,10 +201,11 @@ func FloatEnv(name, def string) (float64, error) {
 }
 
 func ParseAdminChatIDs(raw string) ([]int64, error) {
-	parts := strings.Split(raw, "|")
-	adminIDs := make([]int64, 0, len(parts))
+	adminIDs := make([]int64, 0, strings.Count(raw, "|")+1)
 	seen := map[int64]bool{}
-	for _, part := range parts {
+	for rest := raw; rest != ""; {
+		var part string
+		part, rest, _ = strings.Cut(rest, "|")
 		part = strings.TrimSpace(part)
 		if part == "" {
 			continue
@@ -240,15 +277,31 @@ func isDigits(s string) bool {
 	return true
 }
 
-func (c *Config) IsAdmin(userID int64) bool {
-	for _, id := range c.AdminChatIDs {
-		if id == userID {
-			return true
+// isWebhookSecret reports whether s is a non-empty secret_token Telegram
+// accepts for setWebhook.
+func isWebhookSecret(s string) bool {
+	if s == "" || len(s) > 256 {
+		return false
+	}
+	for _, ch := range s {
+		if !(ch >= 'A' && ch <= 'Z' || ch >= 'a' && ch <= 'z' || ch >= '0' && ch <= '9' || ch == '_' || ch == '-') {
+			return false
 		}
 	}
-	return false
+	return true
+}
+
+func (c *Config) IsAdmin(userID int64) bool {
+	_, ok := c.adminSet[userID]
+	return ok
 }
 
 func (c *Config) IsAdminPrivateChat(chatID int64) bool {
 	return c.IsAdmin(chatID)
 }
+
+// IsAdminGroupChat reports whether chatID is the admin forum group used in
+// group_topic mode.
+func (c *Config) IsAdminGroupChat(chatID int64) bool {
+	return c.topicGroupChatID != 0 && chatID == c.topicGroupChatID
+}
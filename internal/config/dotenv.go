@@ -0,0 +1,99 @@
+package config
+
+import (
+	"fmt"
+	"os"
+	"strings"
+)
+
+// loadDotEnv sets variables from a KEY=VALUE file without overriding ones
+// already present in the environment. It accepts the subset of dotenv syntax
+// the example file uses: comments, optional "export", single quotes taken
+// literally, double quotes with \n, \r and backslash escapes (and may span
+// lines), and unquoted values ending at " #".
+func loadDotEnv(path string) error {
+	data, err := os.ReadFile(path)
+	if err != nil {
+		return err
+	}
+	rest := string(data)
+	for lineNo := 1; rest != ""; lineNo++ {
+		var line string
+		line, rest, _ = strings.Cut(rest, "\n")
+		line = strings.TrimSpace(line)
+		if line == "" || line[0] == '#' {
+			continue
+		}
+		key, value, ok := strings.Cut(strings.TrimPrefix(line, "export "), "=")
+		if !ok {
+			continue
+		}
+		key = strings.TrimSpace(key)
+		value = strings.TrimLeft(value, " \t")
+		if value != "" && (value[0] == '"' || value[0] == '\'') {
+			quote := value[0]
+			end := closingQuote(value[1:], quote)
+			for end < 0 && rest != "" {
+				var next string
+				next, rest, _ = strings.Cut(rest, "\n")
+				lineNo++
+				value += "\n" + strings.TrimSuffix(next, "\r")
+				end = closingQuote(value[1:], quote)
+			}
+			if end < 0 {
+				return fmt.Errorf("%s 第 %d 行引号未闭合: %s", path, lineNo, key)
+			}
+			value = value[1 : end+1]
+			if quote == '"' {
+				value = unescapeDotEnv(value)
+			}
+		} else {
+			if i := strings.Index(value, " #"); i >= 0 {
+				value = value[:i]
+			}
+			value = strings.TrimSpace(value)
+		}
+		if _, exists := os.LookupEnv(key); !exists {
+			_ = os.Setenv(key, value)
+		}
+	}
+	return nil
+}
+
+// closingQuote returns the index of the quote ending s, skipping
+// backslash-escaped characters inside double quotes, or -1.
+func closingQuote(s string, quote byte) int {
+	for i := 0; i < len(s); i++ {
+		switch {
+		case s[i] == '\\' && quote == '"':
+			i++
+		case s[i] == quote:
+			return i
+		}
+	}
+	return -1
+}
+
+func unescapeDotEnv(s string) string {
+	if !strings.Contains(s, `\`) {
+		return s
+	}
+	var b strings.Builder
+	b.Grow(len(s))
+	for i := 0; i < len(s); i++ {
+		if s[i] != '\\' || i+1 == len(s) {
+			b.WriteByte(s[i])
+			continue
+		}
+		i++
+		switch s[i] {
+		case 'n':
+			b.WriteByte('\n')
+		case 'r':
+			b.WriteByte('\r')
+		default:
+			b.WriteByte(s[i])
+		}
+	}
+	return b.String()
+}
@@ -2,16 +2,35 @@ package domain
 
 import (
 	"fmt"
-	"regexp"
 	"strconv"
 	"strings"
+	"sync/atomic"
 	"time"
+	"unicode/utf8"
 )
 
-const PendingInputTimeout = 180 * time.Second
+const (
+	PendingInputTimeout = 180 * time.Second
+	MaxTopicTitleLen    = 128
+)
+
+var expiryUnits = [...]time.Duration{time.Minute, time.Hour, 24 * time.Hour, 7 * 24 * time.Hour}
+
+type isoSecond struct {
+	unix  int64
+	value string
+}
+
+var lastISOSecond atomic.Pointer[isoSecond]
 
 func UTCNowISO() string {
-	return time.Now().UTC().Truncate(time.Second).Format(time.RFC3339)
+	now := time.Now().Unix()
+	if cached := lastISOSecond.Load(); cached != nil && cached.unix == now {
+		return cached.value
+	}
+	value := time.Unix(now, 0).UTC().Format(time.RFC3339)
+	lastISOSecond.Store(&isoSecond{unix: now, value: value})
+	return value
 }
 
 func DisplayName(username, fullName string) string {
@@ -21,39 +40,55 @@ func DisplayName(username, fullName string) string {
 	return fullName
 }
 
+// BuildUserTopicTitle renders "<name> @<username> (<id>)", truncating only the
+// name so the title fits MaxTopicTitleLen. It runs for every relayed message in
+// group_topic mode, so it writes into one pre-sized buffer.
 func BuildUserTopicTitle(username, fullName string, userID int64) string {
-	if strings.TrimSpace(username) != "" {
-		return fmt.Sprintf("%s @%s (%d)", fullName, username, userID)
+	var idBuf [20]byte
+	id := strconv.AppendInt(idBuf[:0], userID, 10)
+	hasUsername := strings.TrimSpace(username) != ""
+	tailBytes, tailRunes := len(id)+2, len(id)+2
+	if hasUsername {
+		tailBytes += len(username) + 2
+		tailRunes += utf8.RuneCountInString(username) + 2
+	}
+	if fullName != "" {
+		if budget := MaxTopicTitleLen - tailRunes - 1; utf8.RuneCountInString(fullName) > budget {
+			fullName = string([]rune(fullName)[:max(budget, 0)])
+		}
 	}
-	return fmt.Sprintf("%s (%d)", fullName, userID)
+	var b strings.Builder
+	b.Grow(len(fullName) + 1 + tailBytes)
+	if fullName != "" {
+		b.WriteString(fullName)
+		b.WriteByte(' ')
+	}
+	if hasUsername {
+		b.WriteByte('@')
+		b.WriteString(username)
+		b.WriteByte(' ')
+	}
+	b.WriteByte('(')
+	b.Write(id)
+	b.WriteByte(')')
+	return b.String()
 }
 
 func ParseExpiryToken(raw string) *string {
 	text := strings.ToLower(strings.TrimSpace(raw))
-	if text == "" {
+	if len(text) < 2 {
 		return nil
 	}
-	durationRe := regexp.MustCompile(`^(\d+)([mhdw])$`)
-	if matches := durationRe.FindStringSubmatch(text); matches != nil {
-		amount, _ := strconv.Atoi(matches[1])
-		if amount <= 0 {
+	if unit := strings.IndexByte("mhdw", text[len(text)-1]); unit >= 0 && allDigits(text[:len(text)-1]) {
+		amount, err := strconv.Atoi(text[:len(text)-1])
+		if err != nil || amount <= 0 {
 			return nil
 		}
-		var delta time.Duration
-		switch matches[2] {
-		case "m":
-			delta = time.Duration(amount) * time.Minute
-		case "h":
-			delta = time.Duration(amount) * time.Hour
-		case "d":
-			delta = time.Duration(amount) * 24 * time.Hour
-		case "w":
-			delta = time.Duration(amount) * 7 * 24 * time.Hour
-		}
+		delta := time.Duration(amount) * expiryUnits[unit]
 		value := time.Now().UTC().Add(delta).Truncate(time.Second).Format(time.RFC3339)
 		return &value
 	}
-	if regexp.MustCompile(`^\d{4}-\d{2}-\d{2}$`).MatchString(text) {
+	if len(text) == len("2006-01-02") && allDigits(text[:4]) && text[4] == '-' && allDigits(text[5:7]) && text[7] == '-' && allDigits(text[8:]) {
 		parsed, err := time.ParseInLocation("2006-01-02", text, time.UTC)
 		if err != nil {
 			return nil
@@ -64,11 +99,20 @@ func ParseExpiryToken(raw string) *string {
 	return nil
 }
 
+func allDigits(s string) bool {
+	for i := 0; i < len(s); i++ {
+		if s[i] < '0' || s[i] > '9' {
+			return false
+		}
+	}
+	return s != ""
+}
+
 func FormatExpiryDisplay(expiresAt *string) string {
 	if expiresAt == nil || *expiresAt == "" {
 		return "永久"
 	}
-	expires, err := parseISOTime(*expiresAt)
+	expires, err := ParseISOTime(*expiresAt)
 	if err != nil {
 		return *expiresAt
 	}
@@ -76,23 +120,14 @@ func FormatExpiryDisplay(expiresAt *string) string {
 	if remaining <= 0 {
 		return "已过期"
 	}
-	days := int(remaining.Hours()) / 24
-	hours := int(remaining.Hours()) % 24
-	minutes := int(remaining.Minutes()) % 60
-	if days > 0 {
-		return fmt.Sprintf("%d天%d小时后", days, hours)
-	}
-	if hours > 0 {
-		return fmt.Sprintf("%d小时%d分钟后", hours, minutes)
-	}
-	return fmt.Sprintf("%d分钟后", minutes)
+	return formatRemaining(remaining, false)
 }
 
 func FormatUnbanTimeDisplay(expiresAt *string) string {
 	if expiresAt == nil || *expiresAt == "" {
 		return "永久"
 	}
-	expires, err := parseISOTime(*expiresAt)
+	expires, err := ParseISOTime(*expiresAt)
 	if err != nil {
 		return "永久"
 	}
@@ -100,22 +135,30 @@ func FormatUnbanTimeDisplay(expiresAt *string) string {
 	if remaining <= 0 {
 		return "即将解封"
 	}
+	return formatRemaining(remaining, true)
+}
+
+func formatRemaining(remaining time.Duration, unban bool) string {
+	suffix := "后"
+	if unban {
+		suffix = ""
+	}
 	days := int(remaining.Hours()) / 24
 	hours := int(remaining.Hours()) % 24
 	minutes := int(remaining.Minutes()) % 60
 	if days > 0 {
-		return fmt.Sprintf("%d天%d小时", days, hours)
+		return fmt.Sprintf("%d天%d小时%s", days, hours, suffix)
 	}
 	if hours > 0 {
-		return fmt.Sprintf("%d小时%d分钟", hours, minutes)
+		return fmt.Sprintf("%d小时%d分钟%s", hours, minutes, suffix)
 	}
-	if minutes < 1 {
+	if unban && minutes < 1 {
 		minutes = 1
 	}
-	return fmt.Sprintf("%d分钟", minutes)
+	return fmt.Sprintf("%d分钟%s", minutes, suffix)
 }
 
-func parseISOTime(value string) (time.Time, error) {
+func ParseISOTime(value string) (time.Time, error) {
 	parsed, err := time.Parse(time.RFC3339, value)
 	if err == nil {
 		return parsed, nil
@@ -151,40 +194,46 @@ func ParseBanExtraArgs(args []string) (expiresAt *string, reason *string, note *
 	return expiresAt, reason, nil
 }
 
+var triggerTypeAliases = map[string]string{
+	"exact": "exact", "精确": "exact", "精准": "exact",
+	"contains": "contains", "包含": "contains",
+	"prefix": "prefix", "前缀": "prefix",
+	"regex": "regex", "正则": "regex",
+}
+
 func ParseRuleAddPayload(raw string) (triggerType, triggerText, replyText string, ok bool) {
-	if !strings.Contains(raw, "=>") {
+	left, replyText, found := strings.Cut(raw, "=>")
+	if !found {
 		return "", "", "", false
 	}
-	parts := strings.SplitN(raw, "=>", 2)
-	left := strings.TrimSpace(parts[0])
-	replyText = strings.TrimSpace(parts[1])
-	if left == "" || replyText == "" || !strings.Contains(left, " ") {
+	left = strings.TrimSpace(left)
+	replyText = strings.TrimSpace(replyText)
+	if left == "" || replyText == "" {
 		return "", "", "", false
 	}
-	leftParts := strings.SplitN(left, " ", 2)
-	aliases := map[string]string{
-		"exact": "exact", "精确": "exact", "精准": "exact",
-		"contains": "contains", "包含": "contains",
-		"prefix": "prefix", "前缀": "prefix",
-		"regex": "regex", "正则": "regex",
+	typeText, triggerText, found := strings.Cut(left, " ")
+	if !found {
+		return "", "", "", false
 	}
-	triggerType = aliases[strings.ToLower(strings.TrimSpace(leftParts[0]))]
-	triggerText = strings.TrimSpace(leftParts[1])
+	triggerType = triggerTypeAliases[strings.ToLower(strings.TrimSpace(typeText))]
+	triggerText = strings.TrimSpace(triggerText)
 	if triggerType == "" || triggerText == "" {
 		return "", "", "", false
 	}
 	return triggerType, triggerText, replyText, true
 }
 
+var statsWindows = map[string]time.Duration{
+	"24h": 24 * time.Hour,
+	"7d":  7 * 24 * time.Hour,
+	"30d": 30 * 24 * time.Hour,
+}
+
 func ParseStatsWindow(arg string) (string, time.Time) {
-	text := strings.ToLower(strings.TrimSpace(arg))
-	now := time.Now().UTC()
-	switch text {
-	case "7d":
-		return "7d", now.Add(-7 * 24 * time.Hour)
-	case "30d":
-		return "30d", now.Add(-30 * 24 * time.Hour)
-	default:
-		return "24h", now.Add(-24 * time.Hour)
+	key := strings.ToLower(strings.TrimSpace(arg))
+	window, ok := statsWindows[key]
+	if !ok {
+		key, window = "24h", statsWindows["24h"]
 	}
+	return key, time.Now().UTC().Add(-window)
 }
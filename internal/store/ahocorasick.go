@@ -0,0 +1,67 @@
+package store
+
+import "math"
+
+// acMatcher is an Aho-Corasick automaton over byte strings. Each pattern carries
+// an integer payload, and first reports the smallest payload found in a text.
+type acMatcher struct {
+	next []map[byte]int32
+	fail []int32
+	out  []int
+}
+
+func newACMatcher() *acMatcher {
+	return &acMatcher{next: []map[byte]int32{{}}, fail: []int32{0}, out: []int{math.MaxInt}}
+}
+
+func (m *acMatcher) add(pattern string, payload int) {
+	state := int32(0)
+	for i := 0; i < len(pattern); i++ {
+		child, ok := m.next[state][pattern[i]]
+		if !ok {
+			child = int32(len(m.next))
+			m.next = append(m.next, map[byte]int32{})
+			m.fail = append(m.fail, 0)
+			m.out = append(m.out, math.MaxInt)
+			m.next[state][pattern[i]] = child
+		}
+		state = child
+	}
+	m.out[state] = min(m.out[state], payload)
+}
+
+func (m *acMatcher) build() {
+	queue := make([]int32, 0, len(m.next))
+	for _, child := range m.next[0] {
+		queue = append(queue, child)
+	}
+	for len(queue) > 0 {
+		state := queue[0]
+		queue = queue[1:]
+		for b, child := range m.next[state] {
+			f := m.fail[state]
+			for f != 0 && m.next[f][b] == 0 {
+				f = m.fail[f]
+			}
+			if target, ok := m.next[f][b]; ok && target != child {
+				m.fail[child] = target
+			}
+			m.out[child] = min(m.out[child], m.out[m.fail[child]])
+			queue = append(queue, child)
+		}
+	}
+}
+
+func (m *acMatcher) first(text string) int {
+	best := m.out[0]
+	state := int32(0)
+	for i := 0; i < len(text); i++ {
+		b := text[i]
+		for state != 0 && m.next[state][b] == 0 {
+			state = m.fail[state]
+		}
+		state = m.next[state][b]
+		best = min(best, m.out[state])
+	}
+	return best
+}
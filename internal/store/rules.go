@@ -0,0 +1,142 @@
+package store
+
+import (
+	"context"
+	"regexp"
+	"strings"
+)
+
+type ruleIndex struct {
+	version    uint64
+	rules      []Rule
+	exact      map[string]int
+	contains   *acMatcher
+	prefixes   map[byte][]literalRule
+	regexes    []regexRule
+	regexUnion *regexp.Regexp
+}
+
+type literalRule struct {
+	pos  int
+	text string
+}
+
+type regexRule struct {
+	pos int
+	re  *regexp.Regexp
+}
+
+func (s *SQLite) loadRuleIndex(ctx context.Context) (*ruleIndex, error) {
+	version := s.rulesVersion.Load()
+	if idx := s.rules.Load(); idx != nil && idx.version == version {
+		return idx, nil
+	}
+	s.rulesMu.Lock()
+	defer s.rulesMu.Unlock()
+	if idx := s.rules.Load(); idx != nil && idx.version == version {
+		return idx, nil
+	}
+	rows, err := s.reader.QueryContext(ctx, `SELECT id, trigger_type, trigger_text, reply_text, priority, is_enabled, created_by_admin_id, created_at, updated_at FROM auto_reply_rules WHERE is_enabled = 1 ORDER BY priority ASC, id ASC`)
+	if err != nil {
+		return nil, err
+	}
+	defer rows.Close()
+	idx := &ruleIndex{version: version, exact: map[string]int{}, prefixes: map[byte][]literalRule{}}
+	contains := newACMatcher()
+	hasContains := false
+	patterns := []string{}
+	regexes := map[int64]*regexp.Regexp{}
+	for rows.Next() {
+		r, err := scanRule(rows)
+		if err != nil {
+			return nil, err
+		}
+		pos := len(idx.rules)
+		switch r.TriggerType {
+		case "exact":
+			if _, ok := idx.exact[r.TriggerText]; !ok {
+				idx.exact[r.TriggerText] = pos
+			}
+		case "contains":
+			contains.add(r.TriggerText, pos)
+			hasContains = true
+		case "prefix":
+			if r.TriggerText == "" {
+				continue
+			}
+			idx.prefixes[r.TriggerText[0]] = append(idx.prefixes[r.TriggerText[0]], literalRule{pos: pos, text: r.TriggerText})
+		case "regex":
+			re, ok := s.ruleRegexes[r.ID]
+			if !ok {
+				compiled, err := regexp.Compile(r.TriggerText)
+				if err != nil {
+					continue
+				}
+				re = compiled
+			}
+			regexes[r.ID] = re
+			patterns = append(patterns, "(?:"+r.TriggerText+")")
+			idx.regexes = append(idx.regexes, regexRule{pos: pos, re: re})
+		default:
+			continue
+		}
+		idx.rules = append(idx.rules, r)
+	}
+	if err := rows.Err(); err != nil {
+		return nil, err
+	}
+	if hasContains {
+		contains.build()
+		idx.contains = contains
+	}
+	if len(patterns) > 0 {
+		union := strings.Join(patterns, "|")
+		if prev := s.rules.Load(); prev != nil && prev.regexUnion != nil && prev.regexUnion.String() == union {
+			idx.regexUnion = prev.regexUnion
+		} else {
+			idx.regexUnion, _ = regexp.Compile(union)
+		}
+	}
+	s.ruleRegexes = regexes
+	s.rules.Store(idx)
+	return idx, nil
+}
+
+// match returns the first rule in (priority, id) order whose trigger matches.
+// Each trigger type is searched on its own and the lowest position wins.
+func (idx *ruleIndex) match(text string) *Rule {
+	best := len(idx.rules)
+	if pos, ok := idx.exact[text]; ok {
+		best = pos
+	}
+	if idx.contains != nil {
+		best = min(best, idx.contains.first(text))
+	}
+	if text != "" {
+		for _, p := range idx.prefixes[text[0]] {
+			if p.pos >= best {
+				break
+			}
+			if strings.HasPrefix(text, p.text) {
+				best = p.pos
+				break
+			}
+		}
+	}
+	if len(idx.regexes) > 0 && idx.regexes[0].pos < best && (idx.regexUnion == nil || idx.regexUnion.MatchString(text)) {
+		for _, r := range idx.regexes {
+			if r.pos >= best {
+				break
+			}
+			if r.re.MatchString(text) {
+				best = r.pos
+				break
+			}
+		}
+	}
+	if best == len(idx.rules) {
+		return nil
+	}
+	r := idx.rules[best]
+	return &r
+}
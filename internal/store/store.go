@@ -3,12 +3,16 @@ package store
 import (
 	"context"
 	"database/sql"
+	"errors"
 	"fmt"
+	"log"
 	"regexp"
 	"strings"
 	"sync"
+	"sync/atomic"
 	"time"
 
+	"telegramrelaypm/internal/cache"
 	"telegramrelaypm/internal/domain"
 
 	_ "modernc.org/sqlite"
@@ -89,33 +93,202 @@ type TopUser struct {
 }
 
 type SQLite struct {
-	db             *sql.DB
-	mu             sync.RWMutex
-	primaryAdminID int64
+	writer          *sql.DB
+	reader          *sql.DB
+	insertMapStmt   *sql.Stmt
+	upsertUserStmt  *sql.Stmt
+	insertAuditStmt *sql.Stmt
+	targetUserStmt  *sql.Stmt
+	linkedMapsStmt  *sql.Stmt
+	adminMapsStmt   *sql.Stmt
+	topicUserStmt   *sql.Stmt
+	banExpiryStmt   *sql.Stmt
+	primaryAdminID  int64
+	auditQueue      chan auditRecord
+	auditDone       chan struct{}
+	rules           atomic.Pointer[ruleIndex]
+	rulesVersion    atomic.Uint64
+	rulesMu         sync.Mutex
+	ruleRegexes     map[int64]*regexp.Regexp
+	touchMu         sync.Mutex
+	touches         map[int64]pendingTouch
+	touchStop       chan struct{}
+	touchDone       chan struct{}
+	touched         *cache.LRU[int64, touchedUser]
+	topics          *cache.LRU[int64, UserTopic]
+	bans            *cache.LRU[int64, banState]
+	targets         *cache.LRU[adminMessageKey, int64]
+	linked          *cache.LRU[adminMessageKey, []MessageMap]
+	topicUsers      *cache.LRU[adminMessageKey, int64]
+	sessionsMu      sync.Mutex
+	sessions        map[int64]*int64
+}
+
+// adminMessageKey identifies a message (or, for topicUsers, a forum thread)
+// within a chat.
+type adminMessageKey struct {
+	chatID    int64
+	messageID int
+}
+
+// banState is the cached result of a ban lookup; a zero expires means the ban
+// is permanent (or its expiry could not be parsed).
+type banState struct {
+	banned  bool
+	expires time.Time
+}
+
+type pendingTouch struct {
+	username string
+	fullName string
+	at       string
+}
+
+// touchedUser is the profile last queued for a user; while it is cached and
+// unchanged, further touches are dropped.
+type touchedUser struct {
+	username string
+	fullName string
+}
+
+type auditRecord struct {
+	event     AuditEvent
+	createdAt string
+}
+
+const (
+	readerConns        = 4
+	auditQueueSize     = 4096
+	auditBatchSize     = 500
+	auditFlushInterval = 200 * time.Millisecond
+	touchFlushInterval = 2 * time.Second
+	touchCacheSize     = 4096
+	touchRefreshTTL    = time.Minute
+	topicCacheSize     = 4096
+	banCacheSize       = 16384
+	banCacheTTL        = time.Minute
+	targetCacheSize    = 4096
+	targetCacheTTL     = 5 * time.Minute
+	linkedCacheSize    = 4096
+	linkedCacheTTL     = 10 * time.Minute
+)
+
+var sqlitePragmas = []string{
+	"busy_timeout(5000)",
+	"journal_mode(WAL)",
+	"synchronous(NORMAL)",
+	"temp_store(MEMORY)",
+	"cache_size(-65536)",
+	"mmap_size(268435456)",
 }
 
 func OpenSQLite(ctx context.Context, path string, primaryAdminID int64) (*SQLite, error) {
-	db, err := sql.Open("sqlite", path)
+	writer, err := sql.Open("sqlite", sqliteDSN(path, "_txlock=immediate"))
 	if err != nil {
 		return nil, err
 	}
-	db.SetMaxOpenConns(1)
-	s := &SQLite{db: db, primaryAdminID: primaryAdminID}
+	writer.SetMaxOpenConns(1)
+	writer.SetMaxIdleConns(1)
+	s := &SQLite{
+		writer:         writer,
+		primaryAdminID: primaryAdminID,
+		topics:         cache.NewLRU[int64, UserTopic](topicCacheSize, 0),
+		bans:           cache.NewLRU[int64, banState](banCacheSize, banCacheTTL),
+		targets:        cache.NewLRU[adminMessageKey, int64](targetCacheSize, targetCacheTTL),
+		linked:         cache.NewLRU[adminMessageKey, []MessageMap](linkedCacheSize, linkedCacheTTL),
+		topicUsers:     cache.NewLRU[adminMessageKey, int64](topicCacheSize, 0),
+		touched:        cache.NewLRU[int64, touchedUser](touchCacheSize, touchRefreshTTL),
+		sessions:       map[int64]*int64{},
+	}
 	if err := s.initSchema(ctx); err != nil {
-		_ = db.Close()
+		_ = writer.Close()
 		return nil, err
 	}
+	if err := s.prepareWriteStatements(ctx); err != nil {
+		_ = writer.Close()
+		return nil, err
+	}
+	reader, err := sql.Open("sqlite", sqliteDSN(path, "_pragma=query_only(1)"))
+	if err != nil {
+		_ = writer.Close()
+		return nil, err
+	}
+	// Keep every reader connection open: database/sql only retains two idle
+	// connections by default, and a reopened one repeats the DSN pragmas and
+	// starts with a cold page cache.
+	reader.SetMaxOpenConns(readerConns)
+	reader.SetMaxIdleConns(readerConns)
+	s.reader = reader
+	if err := s.prepareReadStatements(ctx); err != nil {
+		_ = reader.Close()
+		_ = writer.Close()
+		return nil, err
+	}
+	s.auditQueue = make(chan auditRecord, auditQueueSize)
+	s.auditDone = make(chan struct{})
+	go s.runAuditFlusher()
+	s.touches = map[int64]pendingTouch{}
+	s.touchStop = make(chan struct{})
+	s.touchDone = make(chan struct{})
+	go s.runTouchFlusher()
 	return s, nil
 }
 
-func (s *SQLite) Close() error { return s.db.Close() }
+func (s *SQLite) Close() error {
+	close(s.auditQueue)
+	close(s.touchStop)
+	<-s.auditDone
+	<-s.touchDone
+	// Refresh planner statistics for tables whose shape changed this run, as
+	// SQLite recommends before closing a long-lived connection.
+	if _, err := s.writer.Exec("PRAGMA optimize"); err != nil {
+		log.Printf("sqlite optimize failed: %v", err)
+	}
+	return errors.Join(s.reader.Close(), s.writer.Close())
+}
 
-func (s *SQLite) initSchema(ctx context.Context) error {
-	s.mu.Lock()
-	defer s.mu.Unlock()
+// prepareWriteStatements prepares the per-message write statements once on
+// the single writer connection so hot paths skip SQL parsing.
+func (s *SQLite) prepareWriteStatements(ctx context.Context) error {
+	var err error
+	if s.insertMapStmt, err = s.writer.PrepareContext(ctx, insertMappingSQL); err != nil {
+		return err
+	}
+	if s.upsertUserStmt, err = s.writer.PrepareContext(ctx, upsertUserSQL); err != nil {
+		return err
+	}
+	s.insertAuditStmt, err = s.writer.PrepareContext(ctx, auditInsertFull)
+	return err
+}
 
-	_, err := s.db.ExecContext(ctx, `
-PRAGMA journal_mode=WAL;
+// prepareReadStatements prepares the lookups behind cache misses on the
+// reply and edit paths; database/sql re-prepares them per reader connection
+// on first use and keeps them for the connection's lifetime.
+func (s *SQLite) prepareReadStatements(ctx context.Context) error {
+	var err error
+	for _, p := range []struct {
+		dst   **sql.Stmt
+		query string
+	}{
+		{&s.targetUserStmt, targetUserSQL},
+		{&s.linkedMapsStmt, linkedMapsSQL},
+		{&s.adminMapsStmt, adminMapsSQL},
+		{&s.topicUserStmt, topicUserSQL},
+		{&s.banExpiryStmt, banExpirySQL},
+	} {
+		if *p.dst, err = s.reader.PrepareContext(ctx, p.query); err != nil {
+			return err
+		}
+	}
+	return nil
+}
+
+func (s *SQLite) initSchema(ctx context.Context) error {
+	_, err := s.writer.ExecContext(ctx, `
+CREATE TABLE IF NOT EXISTS schema_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
 
 CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY,
@@ -135,8 +308,10 @@ CREATE TABLE IF NOT EXISTS message_map (
     created_at TEXT NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS idx_message_map_admin_msg ON message_map(admin_chat_id, admin_message_id);
-CREATE INDEX IF NOT EXISTS idx_message_map_user_msg ON message_map(user_chat_id, user_message_id);
+DROP INDEX IF EXISTS idx_message_map_admin_msg;
+DROP INDEX IF EXISTS idx_message_map_user_msg;
+CREATE INDEX IF NOT EXISTS idx_message_map_admin_msg_cov ON message_map(admin_chat_id, admin_message_id, id DESC, user_chat_id, direction, user_message_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_message_map_user_dir ON message_map(user_chat_id, user_message_id, direction, id DESC, admin_chat_id, admin_message_id, created_at);
 
 CREATE TABLE IF NOT EXISTS admin_state (
     admin_chat_id INTEGER PRIMARY KEY,
@@ -154,11 +329,6 @@ CREATE TABLE IF NOT EXISTS user_topics (
 
 CREATE UNIQUE INDEX IF NOT EXISTS idx_user_topics_group_thread ON user_topics(admin_group_chat_id, topic_thread_id);
 
-CREATE TABLE IF NOT EXISTS banned_users (
-    user_id INTEGER PRIMARY KEY,
-    banned_at TEXT NOT NULL
-);
-
 CREATE TABLE IF NOT EXISTS ban_list (
     user_id INTEGER PRIMARY KEY,
     created_at TEXT NOT NULL,
@@ -213,103 +383,322 @@ CREATE INDEX IF NOT EXISTS idx_audit_events_admin_time ON audit_events(admin_cha
 }
 
 func (s *SQLite) migrateBanListFromLegacyLocked(ctx context.Context) error {
-	rows, err := s.db.QueryContext(ctx, `SELECT user_id, banned_at FROM banned_users`)
+	var done int
+	if err := s.writer.QueryRowContext(ctx, `SELECT COUNT(*) FROM schema_meta WHERE key = 'legacy_ban_migrated'`).Scan(&done); err != nil {
+		return err
+	}
+	if done > 0 {
+		return nil
+	}
+	var legacy int
+	if err := s.writer.QueryRowContext(ctx, `SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'banned_users'`).Scan(&legacy); err != nil {
+		return err
+	}
+	tx, err := s.writer.BeginTx(ctx, nil)
 	if err != nil {
 		return err
 	}
-	defer rows.Close()
-	for rows.Next() {
-		var userID int64
-		var bannedAt string
-		if err := rows.Scan(&userID, &bannedAt); err != nil {
-			return err
-		}
-		_, err := s.db.ExecContext(ctx, `
+	defer tx.Rollback()
+	if legacy > 0 {
+		_, err := tx.ExecContext(ctx, `
 INSERT INTO ban_list (user_id, created_at, updated_at, operator_admin_id, reason, note, expires_at)
-SELECT ?, ?, ?, ?, NULL, NULL, NULL
-WHERE NOT EXISTS (SELECT 1 FROM ban_list WHERE user_id = ?)
-`, userID, bannedAt, bannedAt, s.primaryAdminID, userID)
+SELECT user_id, banned_at, banned_at, ?, NULL, NULL, NULL FROM banned_users
+WHERE user_id NOT IN (SELECT user_id FROM ban_list)
+`, s.primaryAdminID)
 		if err != nil {
 			return err
 		}
+		if _, err := tx.ExecContext(ctx, `DROP TABLE banned_users`); err != nil {
+			return err
+		}
+	}
+	if _, err := tx.ExecContext(ctx, `INSERT INTO schema_meta (key, value) VALUES ('legacy_ban_migrated', ?)`, domain.UTCNowISO()); err != nil {
+		return err
+	}
+	return tx.Commit()
+}
+
+type txKey struct{}
+
+type txState struct {
+	tx          *sql.Tx
+	afterCommit []func()
+}
+
+// Transaction runs fn with a context bound to one write transaction; store
+// writes issued with that context join it instead of committing on their own.
+// Reads still go through the reader pool and do not see uncommitted rows.
+func (s *SQLite) Transaction(ctx context.Context, fn func(ctx context.Context) error) error {
+	if _, ok := ctx.Value(txKey{}).(*txState); ok {
+		return fn(ctx)
+	}
+	tx, err := s.writer.BeginTx(ctx, nil)
+	if err != nil {
+		return err
+	}
+	defer tx.Rollback()
+	state := &txState{tx: tx}
+	if err := fn(context.WithValue(ctx, txKey{}, state)); err != nil {
+		return err
+	}
+	if err := tx.Commit(); err != nil {
+		return err
+	}
+	for _, f := range state.afterCommit {
+		f()
+	}
+	return nil
+}
+
+func (s *SQLite) exec(ctx context.Context, query string, args ...any) (sql.Result, error) {
+	if state, ok := ctx.Value(txKey{}).(*txState); ok {
+		return state.tx.ExecContext(ctx, query, args...)
+	}
+	return s.writer.ExecContext(ctx, query, args...)
+}
+
+// stmt binds a prepared writer statement to the context's transaction, if any.
+func stmt(ctx context.Context, st *sql.Stmt) *sql.Stmt {
+	if state, ok := ctx.Value(txKey{}).(*txState); ok {
+		return state.tx.StmtContext(ctx, st)
+	}
+	return st
+}
+
+func (s *SQLite) execReturning(ctx context.Context, query string, args []any, dest ...any) error {
+	if state, ok := ctx.Value(txKey{}).(*txState); ok {
+		return state.tx.QueryRowContext(ctx, query, args...).Scan(dest...)
+	}
+	return s.writer.QueryRowContext(ctx, query, args...).Scan(dest...)
+}
+
+// afterWrite runs f once the write is visible to readers: immediately outside
+// a transaction, only after a successful commit inside one. Cache population
+// goes through it so a rolled-back write never reaches the cache.
+func afterWrite(ctx context.Context, f func()) {
+	if state, ok := ctx.Value(txKey{}).(*txState); ok {
+		state.afterCommit = append(state.afterCommit, f)
+		return
+	}
+	f()
+}
+
+// invalidate runs f now and, inside a transaction, again after commit, so a
+// concurrent reader cannot repopulate an entry from pre-commit data. f must
+// only drop cache entries; dropping them early is always safe.
+func invalidate(ctx context.Context, f func()) {
+	f()
+	if state, ok := ctx.Value(txKey{}).(*txState); ok {
+		state.afterCommit = append(state.afterCommit, f)
 	}
-	return rows.Err()
 }
 
 func (s *SQLite) TouchUser(ctx context.Context, userID int64, username, fullName string) error {
-	now := domain.UTCNowISO()
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `
+	profile := touchedUser{username: username, fullName: fullName}
+	if last, ok := s.touched.Get(userID); ok && last == profile {
+		return nil
+	}
+	s.touched.Add(userID, profile)
+	s.touchMu.Lock()
+	s.touches[userID] = pendingTouch{username: username, fullName: fullName, at: domain.UTCNowISO()}
+	s.touchMu.Unlock()
+	return nil
+}
+
+func (s *SQLite) runTouchFlusher() {
+	defer close(s.touchDone)
+	ticker := time.NewTicker(touchFlushInterval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-s.touchStop:
+			s.flushTouches(context.Background())
+			return
+		case <-ticker.C:
+			s.flushTouches(context.Background())
+		}
+	}
+}
+
+func (s *SQLite) flushTouches(ctx context.Context) {
+	s.touchMu.Lock()
+	touches := s.touches
+	if len(touches) == 0 {
+		s.touchMu.Unlock()
+		return
+	}
+	s.touches = make(map[int64]pendingTouch, len(touches))
+	s.touchMu.Unlock()
+	err := s.Transaction(ctx, func(ctx context.Context) error {
+		upsert := stmt(ctx, s.upsertUserStmt)
+		for userID, t := range touches {
+			if _, err := upsert.ExecContext(ctx, userID, nullString(t.username), t.fullName, t.at, t.at); err != nil {
+				return err
+			}
+		}
+		return nil
+	})
+	if err != nil {
+		log.Printf("flush user touches failed: count=%d err=%v", len(touches), err)
+		s.touchMu.Lock()
+		for userID, t := range touches {
+			if _, newer := s.touches[userID]; !newer {
+				s.touches[userID] = t
+			}
+		}
+		s.touchMu.Unlock()
+	}
+}
+
+const (
+	insertMappingSQL = `
+INSERT INTO message_map (user_chat_id, admin_chat_id, user_message_id, admin_message_id, direction, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+`
+	upsertUserSQL = `
 INSERT INTO users (user_id, username, full_name, first_seen_at, last_active_at)
 VALUES (?, ?, ?, ?, ?)
 ON CONFLICT(user_id) DO UPDATE SET
     username=excluded.username,
     full_name=excluded.full_name,
     last_active_at=excluded.last_active_at
-`, userID, nullString(username), fullName, now, now)
-	return err
-}
+`
+)
 
 func (s *SQLite) SaveMapping(ctx context.Context, m MessageMap) error {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `
-INSERT INTO message_map (user_chat_id, admin_chat_id, user_message_id, admin_message_id, direction, created_at)
-VALUES (?, ?, ?, ?, ?, ?)
-`, m.UserChatID, m.AdminChatID, m.UserMessageID, m.AdminMessageID, m.Direction, domain.UTCNowISO())
-	return err
+	_, err := stmt(ctx, s.insertMapStmt).ExecContext(ctx, m.UserChatID, m.AdminChatID, m.UserMessageID, m.AdminMessageID, m.Direction, domain.UTCNowISO())
+	if err != nil {
+		return err
+	}
+	key := adminMessageKey{m.AdminChatID, m.AdminMessageID}
+	userKey := adminMessageKey{m.UserChatID, m.UserMessageID}
+	invalidate(ctx, func() {
+		s.linked.Remove(key)
+		s.linked.Remove(userKey)
+	})
+	afterWrite(ctx, func() { s.targets.Add(key, m.UserChatID) })
+	return nil
+}
+
+func (s *SQLite) SaveMappings(ctx context.Context, maps []MessageMap) error {
+	if len(maps) == 0 {
+		return nil
+	}
+	if len(maps) == 1 {
+		return s.SaveMapping(ctx, maps[0])
+	}
+	now := domain.UTCNowISO()
+	return s.Transaction(ctx, func(ctx context.Context) error {
+		args := make([]any, 0, 6*min(len(maps), mapInsertRows))
+		for rest := maps; len(rest) > 0; {
+			chunk := rest[:min(len(rest), mapInsertRows)]
+			rest = rest[len(chunk):]
+			args = args[:0]
+			for _, m := range chunk {
+				args = append(args, m.UserChatID, m.AdminChatID, m.UserMessageID, m.AdminMessageID, m.Direction, now)
+			}
+			if _, err := s.exec(ctx, mapInsertQuery(len(chunk)), args...); err != nil {
+				return err
+			}
+		}
+		invalidate(ctx, func() {
+			for _, m := range maps {
+				s.linked.Remove(adminMessageKey{m.AdminChatID, m.AdminMessageID})
+				s.linked.Remove(adminMessageKey{m.UserChatID, m.UserMessageID})
+			}
+		})
+		afterWrite(ctx, func() {
+			for _, m := range maps {
+				s.targets.Add(adminMessageKey{m.AdminChatID, m.AdminMessageID}, m.UserChatID)
+			}
+		})
+		return nil
+	})
+}
+
+const mapInsertRows = 500
+
+// mapInsertQuery returns a multi-row INSERT for n mappings, so a broadcast
+// lands in a handful of statements instead of one per recipient.
+func mapInsertQuery(n int) string {
+	const row = "(?, ?, ?, ?, ?, ?)"
+	var b strings.Builder
+	b.Grow(128 + n*(len(row)+2))
+	b.WriteString("INSERT INTO message_map (user_chat_id, admin_chat_id, user_message_id, admin_message_id, direction, created_at) VALUES ")
+	for i := 0; i < n; i++ {
+		if i > 0 {
+			b.WriteString(", ")
+		}
+		b.WriteString(row)
+	}
+	return b.String()
 }
 
 func (s *SQLite) GetTargetUserByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) (*int64, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
+	key := adminMessageKey{adminChatID, adminMessageID}
+	if userID, ok := s.targets.Get(key); ok {
+		return &userID, nil
+	}
 	var userID int64
-	err := s.db.QueryRowContext(ctx, `
-SELECT user_chat_id FROM message_map
-WHERE admin_chat_id = ? AND admin_message_id = ?
-ORDER BY id DESC LIMIT 1
-`, adminChatID, adminMessageID).Scan(&userID)
+	err := s.targetUserStmt.QueryRowContext(ctx, adminChatID, adminMessageID).Scan(&userID)
 	if err == sql.ErrNoRows {
 		return nil, nil
 	}
 	if err != nil {
 		return nil, err
 	}
+	s.targets.Add(key, userID)
 	return &userID, nil
 }
 
-func (s *SQLite) GetUserToAdminMaps(ctx context.Context, userChatID int64, userMessageID int) ([]MessageMap, error) {
-	return s.queryMaps(ctx, `
+// GetLinkedMaps returns the mappings an edit of (chatID, messageID) must be
+// synced to. Results, including empty ones, are cached until a mapping for
+// either side of the key is saved or any mapping is deleted.
+func (s *SQLite) GetLinkedMaps(ctx context.Context, chatID int64, messageID int) ([]MessageMap, error) {
+	key := adminMessageKey{chatID, messageID}
+	if maps, ok := s.linked.Get(key); ok {
+		return maps, nil
+	}
+	maps, err := s.queryMaps(ctx, s.linkedMapsStmt, chatID, messageID, chatID, messageID)
+	if err != nil {
+		return nil, err
+	}
+	s.linked.Add(key, maps)
+	return maps, nil
+}
+
+func (s *SQLite) GetMapsByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) ([]MessageMap, error) {
+	return s.queryMaps(ctx, s.adminMapsStmt, adminChatID, adminMessageID)
+}
+
+const (
+	targetUserSQL = `
+SELECT user_chat_id FROM message_map
+WHERE admin_chat_id = ? AND admin_message_id = ?
+ORDER BY id DESC LIMIT 1
+`
+	linkedMapsSQL = `
 SELECT id, user_chat_id, admin_chat_id, user_message_id, admin_message_id, direction, created_at
 FROM message_map
 WHERE user_chat_id = ? AND user_message_id = ? AND direction = 'user_to_admin'
-ORDER BY id DESC
-`, userChatID, userMessageID)
-}
-
-func (s *SQLite) GetAdminToUserMaps(ctx context.Context, adminChatID int64, adminMessageID int) ([]MessageMap, error) {
-	return s.queryMaps(ctx, `
+UNION ALL
 SELECT id, user_chat_id, admin_chat_id, user_message_id, admin_message_id, direction, created_at
 FROM message_map
 WHERE admin_chat_id = ? AND admin_message_id = ? AND direction IN ('admin_to_user', 'broadcast')
 ORDER BY id DESC
-`, adminChatID, adminMessageID)
-}
-
-func (s *SQLite) GetMapsByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) ([]MessageMap, error) {
-	return s.queryMaps(ctx, `
+`
+	adminMapsSQL = `
 SELECT id, user_chat_id, admin_chat_id, user_message_id, admin_message_id, direction, created_at
 FROM message_map
 WHERE admin_chat_id = ? AND admin_message_id = ?
 ORDER BY id DESC
-`, adminChatID, adminMessageID)
-}
+`
+	topicUserSQL = `SELECT user_id FROM user_topics WHERE admin_group_chat_id = ? AND topic_thread_id = ? LIMIT 1`
+	banExpirySQL = `SELECT NULLIF(expires_at, '') FROM ban_list WHERE user_id = ? LIMIT 1`
+)
 
-func (s *SQLite) queryMaps(ctx context.Context, query string, args ...any) ([]MessageMap, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, query, args...)
+func (s *SQLite) queryMaps(ctx context.Context, query *sql.Stmt, args ...any) ([]MessageMap, error) {
+	rows, err := query.QueryContext(ctx, args...)
 	if err != nil {
 		return nil, err
 	}
@@ -325,19 +714,12 @@ func (s *SQLite) queryMaps(ctx context.Context, query string, args ...any) ([]Me
 	return maps, rows.Err()
 }
 
-func (s *SQLite) GetRecentUsers(ctx context.Context, limit int, excludeUserID *int64) ([]User, error) {
+func (s *SQLite) GetRecentUsers(ctx context.Context, limit int, excludeUserIDs []int64) ([]User, error) {
 	if limit <= 0 {
 		limit = 10
 	}
-	query := `SELECT user_id, username, full_name, last_active_at FROM users ORDER BY last_active_at DESC LIMIT ?`
-	args := []any{limit}
-	if excludeUserID != nil {
-		query = `SELECT user_id, username, full_name, last_active_at FROM users WHERE user_id != ? ORDER BY last_active_at DESC LIMIT ?`
-		args = []any{*excludeUserID, limit}
-	}
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, query, args...)
+	where, args := excludeUsersClause(excludeUserIDs)
+	rows, err := s.reader.QueryContext(ctx, `SELECT user_id, COALESCE(username, ''), full_name, last_active_at FROM users`+where+` ORDER BY last_active_at DESC LIMIT ?`, append(args, limit)...)
 	if err != nil {
 		return nil, err
 	}
@@ -345,26 +727,17 @@ func (s *SQLite) GetRecentUsers(ctx context.Context, limit int, excludeUserID *i
 	users := []User{}
 	for rows.Next() {
 		var u User
-		var username sql.NullString
-		if err := rows.Scan(&u.UserID, &username, &u.FullName, &u.LastActiveAt); err != nil {
+		if err := rows.Scan(&u.UserID, &u.Username, &u.FullName, &u.LastActiveAt); err != nil {
 			return nil, err
 		}
-		u.Username = username.String
 		users = append(users, u)
 	}
 	return users, rows.Err()
 }
 
-func (s *SQLite) GetAllUsers(ctx context.Context, excludeUserID *int64) ([]int64, error) {
-	query := `SELECT user_id FROM users ORDER BY last_active_at DESC`
-	args := []any{}
-	if excludeUserID != nil {
-		query = `SELECT user_id FROM users WHERE user_id != ? ORDER BY last_active_at DESC`
-		args = append(args, *excludeUserID)
-	}
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, query, args...)
+func (s *SQLite) GetAllUsers(ctx context.Context, excludeUserIDs []int64) ([]int64, error) {
+	where, args := excludeUsersClause(excludeUserIDs)
+	rows, err := s.reader.QueryContext(ctx, `SELECT user_id FROM users`+where+` ORDER BY last_active_at DESC`, args...)
 	if err != nil {
 		return nil, err
 	}
@@ -380,49 +753,82 @@ func (s *SQLite) GetAllUsers(ctx context.Context, excludeUserID *int64) ([]int64
 	return ids, rows.Err()
 }
 
+func excludeUsersClause(userIDs []int64) (string, []any) {
+	if len(userIDs) == 0 {
+		return "", nil
+	}
+	args := make([]any, len(userIDs))
+	for i, id := range userIDs {
+		args[i] = id
+	}
+	return " WHERE user_id NOT IN (?" + strings.Repeat(", ?", len(userIDs)-1) + ")", args
+}
+
 func (s *SQLite) SetCurrentSession(ctx context.Context, adminChatID int64, userID *int64) error {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `
+	_, err := s.exec(ctx, `
 INSERT INTO admin_state (admin_chat_id, current_session_user_id) VALUES (?, ?)
 ON CONFLICT(admin_chat_id) DO UPDATE SET current_session_user_id = excluded.current_session_user_id
 `, adminChatID, nullableInt64(userID))
-	return err
+	if err != nil {
+		return err
+	}
+	afterWrite(ctx, func() { s.cacheSession(adminChatID, userID) })
+	return nil
 }
 
 func (s *SQLite) GetCurrentSession(ctx context.Context, adminChatID int64) (*int64, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	var value sql.NullInt64
-	err := s.db.QueryRowContext(ctx, `SELECT current_session_user_id FROM admin_state WHERE admin_chat_id = ?`, adminChatID).Scan(&value)
-	if err == sql.ErrNoRows || !value.Valid {
-		return nil, nil
+	s.sessionsMu.Lock()
+	userID, ok := s.sessions[adminChatID]
+	s.sessionsMu.Unlock()
+	if ok {
+		return userID, nil
 	}
-	if err != nil {
+	err := s.reader.QueryRowContext(ctx, `SELECT current_session_user_id FROM admin_state WHERE admin_chat_id = ?`, adminChatID).Scan(&userID)
+	if err != nil && err != sql.ErrNoRows {
 		return nil, err
 	}
-	return &value.Int64, nil
+	s.cacheSession(adminChatID, userID)
+	return userID, nil
+}
+
+func (s *SQLite) cacheSession(adminChatID int64, userID *int64) {
+	if userID != nil {
+		value := *userID
+		userID = &value
+	}
+	s.sessionsMu.Lock()
+	s.sessions[adminChatID] = userID
+	s.sessionsMu.Unlock()
 }
 
 func (s *SQLite) GetUserTopic(ctx context.Context, userID int64) (*UserTopic, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
+	if t, ok := s.topics.Get(userID); ok {
+		return &t, nil
+	}
 	var t UserTopic
-	err := s.db.QueryRowContext(ctx, `SELECT user_id, admin_group_chat_id, topic_thread_id, topic_title, created_at, updated_at FROM user_topics WHERE user_id = ? LIMIT 1`, userID).Scan(&t.UserID, &t.AdminGroupChatID, &t.TopicThreadID, &t.TopicTitle, &t.CreatedAt, &t.UpdatedAt)
+	err := s.reader.QueryRowContext(ctx, `SELECT user_id, admin_group_chat_id, topic_thread_id, topic_title, created_at, updated_at FROM user_topics WHERE user_id = ? LIMIT 1`, userID).Scan(&t.UserID, &t.AdminGroupChatID, &t.TopicThreadID, &t.TopicTitle, &t.CreatedAt, &t.UpdatedAt)
 	if err == sql.ErrNoRows {
 		return nil, nil
 	}
 	if err != nil {
 		return nil, err
 	}
+	s.topics.Add(userID, t)
 	return &t, nil
 }
 
 func (s *SQLite) UpsertUserTopic(ctx context.Context, t UserTopic) error {
 	now := domain.UTCNowISO()
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `
+	return s.Transaction(ctx, func(ctx context.Context) error {
+		// Read the row being replaced on the writer so its thread's topicUsers
+		// entry is dropped even when the topic is not in the topics cache.
+		var old adminMessageKey
+		err := s.execReturning(ctx, `SELECT admin_group_chat_id, topic_thread_id FROM user_topics WHERE user_id = ?`, []any{t.UserID}, &old.chatID, &old.messageID)
+		if err != nil && err != sql.ErrNoRows {
+			return err
+		}
+		replaced := err == nil
+		if _, err := s.exec(ctx, `
 INSERT INTO user_topics (user_id, admin_group_chat_id, topic_thread_id, topic_title, created_at, updated_at)
 VALUES (?, ?, ?, ?, ?, ?)
 ON CONFLICT(user_id) DO UPDATE SET
@@ -430,36 +836,47 @@ ON CONFLICT(user_id) DO UPDATE SET
     topic_thread_id = excluded.topic_thread_id,
     topic_title = excluded.topic_title,
     updated_at = excluded.updated_at
-`, t.UserID, t.AdminGroupChatID, t.TopicThreadID, t.TopicTitle, now, now)
-	return err
+`, t.UserID, t.AdminGroupChatID, t.TopicThreadID, t.TopicTitle, now, now); err != nil {
+			return err
+		}
+		invalidate(ctx, func() {
+			if replaced {
+				s.topicUsers.Remove(old)
+			}
+			s.topics.Remove(t.UserID)
+		})
+		return nil
+	})
 }
 
 func (s *SQLite) UpdateUserTopicTitle(ctx context.Context, userID int64, title string) error {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `UPDATE user_topics SET topic_title = ?, updated_at = ? WHERE user_id = ?`, title, domain.UTCNowISO(), userID)
-	return err
+	if _, err := s.exec(ctx, `UPDATE user_topics SET topic_title = ?, updated_at = ? WHERE user_id = ?`, title, domain.UTCNowISO(), userID); err != nil {
+		return err
+	}
+	invalidate(ctx, func() { s.topics.Remove(userID) })
+	return nil
 }
 
 func (s *SQLite) GetUserIDByTopic(ctx context.Context, adminGroupChatID int64, topicThreadID int) (*int64, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
+	key := adminMessageKey{adminGroupChatID, topicThreadID}
+	if userID, ok := s.topicUsers.Get(key); ok {
+		return &userID, nil
+	}
 	var userID int64
-	err := s.db.QueryRowContext(ctx, `SELECT user_id FROM user_topics WHERE admin_group_chat_id = ? AND topic_thread_id = ? LIMIT 1`, adminGroupChatID, topicThreadID).Scan(&userID)
+	err := s.topicUserStmt.QueryRowContext(ctx, adminGroupChatID, topicThreadID).Scan(&userID)
 	if err == sql.ErrNoRows {
 		return nil, nil
 	}
 	if err != nil {
 		return nil, err
 	}
+	s.topicUsers.Add(key, userID)
 	return &userID, nil
 }
 
 func (s *SQLite) BanUser(ctx context.Context, userID, operatorAdminID int64, reason, note, expiresAt *string) error {
 	now := domain.UTCNowISO()
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `
+	_, err := s.exec(ctx, `
 INSERT INTO ban_list (user_id, created_at, updated_at, operator_admin_id, reason, note, expires_at)
 VALUES (?, ?, ?, ?, ?, ?, ?)
 ON CONFLICT(user_id) DO UPDATE SET
@@ -469,21 +886,13 @@ ON CONFLICT(user_id) DO UPDATE SET
     note=excluded.note,
     expires_at=excluded.expires_at
 `, userID, now, now, operatorAdminID, nullableString(reason), nullableString(note), nullableString(expiresAt))
-	if err != nil {
-		return err
-	}
-	_, err = s.db.ExecContext(ctx, `INSERT OR REPLACE INTO banned_users (user_id, banned_at) VALUES (?, ?)`, userID, now)
+	invalidate(ctx, func() { s.bans.Remove(userID) })
 	return err
 }
 
 func (s *SQLite) UnbanUser(ctx context.Context, userID int64) (bool, error) {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	res, err := s.db.ExecContext(ctx, `DELETE FROM ban_list WHERE user_id = ?`, userID)
-	if err != nil {
-		return false, err
-	}
-	_, err = s.db.ExecContext(ctx, `DELETE FROM banned_users WHERE user_id = ?`, userID)
+	res, err := s.exec(ctx, `DELETE FROM ban_list WHERE user_id = ?`, userID)
+	invalidate(ctx, func() { s.bans.Remove(userID) })
 	if err != nil {
 		return false, err
 	}
@@ -491,97 +900,110 @@ func (s *SQLite) UnbanUser(ctx context.Context, userID int64) (bool, error) {
 	return count > 0, nil
 }
 
-func (s *SQLite) GetBan(ctx context.Context, userID int64) (*Ban, error) {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	ban, err := s.getBanLocked(ctx, userID)
-	return ban, err
-}
+const banColumns = `user_id, created_at, updated_at, operator_admin_id, COALESCE(reason, ''), COALESCE(note, ''), NULLIF(expires_at, '')`
 
-func (s *SQLite) getBanLocked(ctx context.Context, userID int64) (*Ban, error) {
+func scanBan(scanner interface{ Scan(dest ...any) error }) (Ban, error) {
 	var b Ban
-	var reason, note, expires sql.NullString
-	err := s.db.QueryRowContext(ctx, `SELECT user_id, created_at, updated_at, operator_admin_id, reason, note, expires_at FROM ban_list WHERE user_id = ? LIMIT 1`, userID).Scan(&b.UserID, &b.CreatedAt, &b.UpdatedAt, &b.OperatorAdminID, &reason, &note, &expires)
+	err := scanner.Scan(&b.UserID, &b.CreatedAt, &b.UpdatedAt, &b.OperatorAdminID, &b.Reason, &b.Note, &b.ExpiresAt)
+	return b, err
+}
+
+func (s *SQLite) GetBan(ctx context.Context, userID int64) (*Ban, error) {
+	b, err := scanBan(s.reader.QueryRowContext(ctx, `SELECT `+banColumns+` FROM ban_list WHERE user_id = ? LIMIT 1`, userID))
 	if err == sql.ErrNoRows {
 		return nil, nil
 	}
 	if err != nil {
 		return nil, err
 	}
-	b.Reason = reason.String
-	b.Note = note.String
-	if expires.Valid && expires.String != "" {
-		b.ExpiresAt = &expires.String
-		if expiredISO(expires.String) {
-			_, _ = s.db.ExecContext(ctx, `DELETE FROM ban_list WHERE user_id = ?`, userID)
-			_, _ = s.db.ExecContext(ctx, `DELETE FROM banned_users WHERE user_id = ?`, userID)
-			return nil, nil
-		}
+	if b.ExpiresAt != nil && expiredISO(*b.ExpiresAt) {
+		s.deleteExpiredBan(ctx, userID)
+		return nil, nil
 	}
 	return &b, nil
 }
 
+func (s *SQLite) deleteExpiredBan(ctx context.Context, userID int64) {
+	_, _ = s.exec(ctx, `DELETE FROM ban_list WHERE user_id = ?`, userID)
+	invalidate(ctx, func() { s.bans.Remove(userID) })
+}
+
 func (s *SQLite) IsUserBanned(ctx context.Context, userID int64) (bool, error) {
-	b, err := s.GetBan(ctx, userID)
-	return b != nil, err
+	state, ok := s.bans.Get(userID)
+	if !ok {
+		var expiresAt *string
+		err := s.banExpiryStmt.QueryRowContext(ctx, userID).Scan(&expiresAt)
+		if err != nil && err != sql.ErrNoRows {
+			return false, err
+		}
+		state = banState{banned: err == nil}
+		if expiresAt != nil {
+			state.expires, _ = domain.ParseISOTime(*expiresAt)
+		}
+		s.bans.Add(userID, state)
+	}
+	if !state.banned {
+		return false, nil
+	}
+	if !state.expires.IsZero() && !state.expires.After(time.Now()) {
+		s.deleteExpiredBan(ctx, userID)
+		return false, nil
+	}
+	return true, nil
 }
 
 func (s *SQLite) ListActiveBans(ctx context.Context, limit int) ([]Ban, error) {
 	if limit <= 0 {
 		limit = 20
 	}
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	rows, err := s.db.QueryContext(ctx, `SELECT user_id FROM ban_list ORDER BY updated_at DESC LIMIT ?`, limit)
+	rows, err := s.reader.QueryContext(ctx, `
+SELECT `+banColumns+` FROM ban_list
+WHERE expires_at IS NULL OR expires_at = '' OR expires_at > ?
+ORDER BY updated_at DESC LIMIT ?
+`, domain.UTCNowISO(), limit)
 	if err != nil {
 		return nil, err
 	}
 	defer rows.Close()
-	ids := []int64{}
-	for rows.Next() {
-		var id int64
-		if err := rows.Scan(&id); err != nil {
-			return nil, err
-		}
-		ids = append(ids, id)
-	}
-	if err := rows.Err(); err != nil {
-		return nil, err
-	}
 	bans := []Ban{}
-	for _, id := range ids {
-		b, err := s.getBanLocked(ctx, id)
+	for rows.Next() {
+		b, err := scanBan(rows)
 		if err != nil {
 			return nil, err
 		}
-		if b != nil {
-			bans = append(bans, *b)
-		}
+		bans = append(bans, b)
 	}
-	return bans, nil
+	return bans, rows.Err()
+}
+
+func (s *SQLite) PurgeExpiredBans(ctx context.Context) (int64, error) {
+	res, err := s.exec(ctx, `DELETE FROM ban_list WHERE expires_at IS NOT NULL AND expires_at != '' AND expires_at <= ?`, domain.UTCNowISO())
+	if err != nil {
+		return 0, err
+	}
+	return res.RowsAffected()
 }
 
 func (s *SQLite) AddAutoReplyRule(ctx context.Context, triggerType, triggerText, replyText string, priority int, createdByAdminID int64) (int64, error) {
 	now := domain.UTCNowISO()
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	res, err := s.db.ExecContext(ctx, `
+	var id int64
+	err := s.execReturning(ctx, `
 INSERT INTO auto_reply_rules (trigger_type, trigger_text, reply_text, priority, is_enabled, created_by_admin_id, created_at, updated_at)
 VALUES (?, ?, ?, ?, 1, ?, ?, ?)
-`, triggerType, triggerText, replyText, priority, createdByAdminID, now, now)
+RETURNING id
+`, []any{triggerType, triggerText, replyText, priority, createdByAdminID, now, now}, &id)
 	if err != nil {
 		return 0, err
 	}
-	return res.LastInsertId()
+	afterWrite(ctx, func() { s.rulesVersion.Add(1) })
+	return id, nil
 }
 
 func (s *SQLite) ListAutoReplyRules(ctx context.Context, limit int) ([]Rule, error) {
 	if limit <= 0 {
 		limit = 50
 	}
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, `SELECT id, trigger_type, trigger_text, reply_text, priority, is_enabled, created_by_admin_id, created_at, updated_at FROM auto_reply_rules ORDER BY priority ASC, id ASC LIMIT ?`, limit)
+	rows, err := s.reader.QueryContext(ctx, `SELECT id, trigger_type, trigger_text, reply_text, priority, is_enabled, created_by_admin_id, created_at, updated_at FROM auto_reply_rules ORDER BY priority ASC, id ASC LIMIT ?`, limit)
 	if err != nil {
 		return nil, err
 	}
@@ -598,73 +1020,138 @@ func (s *SQLite) ListAutoReplyRules(ctx context.Context, limit int) ([]Rule, err
 }
 
 func (s *SQLite) SetAutoReplyRuleEnabled(ctx context.Context, ruleID int64, enabled bool) (bool, error) {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	res, err := s.db.ExecContext(ctx, `UPDATE auto_reply_rules SET is_enabled = ?, updated_at = ? WHERE id = ?`, boolInt(enabled), domain.UTCNowISO(), ruleID)
+	res, err := s.exec(ctx, `UPDATE auto_reply_rules SET is_enabled = ?, updated_at = ? WHERE id = ?`, boolInt(enabled), domain.UTCNowISO(), ruleID)
 	if err != nil {
 		return false, err
 	}
+	afterWrite(ctx, func() { s.rulesVersion.Add(1) })
 	count, _ := res.RowsAffected()
 	return count > 0, nil
 }
 
 func (s *SQLite) DeleteAutoReplyRule(ctx context.Context, ruleID int64) (bool, error) {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	res, err := s.db.ExecContext(ctx, `DELETE FROM auto_reply_rules WHERE id = ?`, ruleID)
+	res, err := s.exec(ctx, `DELETE FROM auto_reply_rules WHERE id = ?`, ruleID)
 	if err != nil {
 		return false, err
 	}
+	afterWrite(ctx, func() { s.rulesVersion.Add(1) })
 	count, _ := res.RowsAffected()
 	return count > 0, nil
 }
 
 func (s *SQLite) MatchAutoReplyRule(ctx context.Context, text string) (*Rule, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, `SELECT id, trigger_type, trigger_text, reply_text, priority, is_enabled, created_by_admin_id, created_at, updated_at FROM auto_reply_rules WHERE is_enabled = 1 ORDER BY priority ASC, id ASC`)
+	idx, err := s.loadRuleIndex(ctx)
 	if err != nil {
 		return nil, err
 	}
-	defer rows.Close()
-	candidate := strings.TrimSpace(text)
-	for rows.Next() {
-		r, err := scanRule(rows)
-		if err != nil {
-			return nil, err
+	return idx.match(strings.TrimSpace(text)), nil
+}
+
+func (s *SQLite) RecordAuditEvent(ctx context.Context, e AuditEvent) error {
+	record := auditRecord{event: e, createdAt: domain.UTCNowISO()}
+	select {
+	case s.auditQueue <- record:
+		return nil
+	default:
+		return s.insertAuditEvents(ctx, []auditRecord{record})
+	}
+}
+
+func (s *SQLite) RecordAuditEvents(ctx context.Context, events []AuditEvent) error {
+	now := domain.UTCNowISO()
+	var overflow []auditRecord
+	for _, e := range events {
+		record := auditRecord{event: e, createdAt: now}
+		select {
+		case s.auditQueue <- record:
+		default:
+			overflow = append(overflow, record)
+		}
+	}
+	if len(overflow) == 0 {
+		return nil
+	}
+	return s.insertAuditEvents(ctx, overflow)
+}
+
+func (s *SQLite) runAuditFlusher() {
+	defer close(s.auditDone)
+	ticker := time.NewTicker(auditFlushInterval)
+	defer ticker.Stop()
+	batch := make([]auditRecord, 0, auditBatchSize)
+	flush := func() {
+		if len(batch) == 0 {
+			return
+		}
+		if err := s.insertAuditEvents(context.Background(), batch); err != nil {
+			log.Printf("flush audit events failed: count=%d err=%v", len(batch), err)
 		}
-		matched := false
-		switch r.TriggerType {
-		case "exact":
-			matched = candidate == r.TriggerText
-		case "contains":
-			matched = strings.Contains(candidate, r.TriggerText)
-		case "prefix":
-			matched = strings.HasPrefix(candidate, r.TriggerText)
-		case "regex":
-			matched, _ = regexp.MatchString(r.TriggerText, candidate)
+		batch = batch[:0]
+	}
+	for {
+		select {
+		case record, ok := <-s.auditQueue:
+			if !ok {
+				flush()
+				return
+			}
+			batch = append(batch, record)
+			if len(batch) >= auditBatchSize {
+				flush()
+			}
+		case <-ticker.C:
+			flush()
 		}
-		if matched {
-			return &r, nil
+	}
+}
+
+const auditInsertRows = 200
+
+var auditInsertFull = auditInsertQuery(auditInsertRows)
+
+// auditInsertQuery returns a multi-row INSERT for n audit events; 13 columns
+// per row keeps a full chunk well under SQLite's bound parameter limit.
+func auditInsertQuery(n int) string {
+	const row = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+	var b strings.Builder
+	b.Grow(256 + n*(len(row)+2))
+	b.WriteString("INSERT INTO audit_events (event_type, user_id, admin_chat_id, chat_id, message_id, mapped_message_id, message_kind, is_edited, direction, outcome, error_class, error_code, created_at) VALUES ")
+	for i := 0; i < n; i++ {
+		if i > 0 {
+			b.WriteString(", ")
 		}
+		b.WriteString(row)
 	}
-	return nil, rows.Err()
+	return b.String()
 }
 
-func (s *SQLite) RecordAuditEvent(ctx context.Context, e AuditEvent) error {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	_, err := s.db.ExecContext(ctx, `
-INSERT INTO audit_events (event_type, user_id, admin_chat_id, chat_id, message_id, mapped_message_id, message_kind, is_edited, direction, outcome, error_class, error_code, created_at)
-VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-`, e.EventType, nullableInt64(e.UserID), nullableInt64(e.AdminChatID), nullableInt64(e.ChatID), nullableInt(e.MessageID), nullableInt(e.MappedMessageID), nullableString(e.MessageKind), boolInt(e.IsEdited), nullableString(e.Direction), e.Outcome, nullableString(e.ErrorClass), nullableString(e.ErrorCode), domain.UTCNowISO())
-	return err
+func (s *SQLite) insertAuditEvents(ctx context.Context, records []auditRecord) error {
+	return s.Transaction(ctx, func(ctx context.Context) error {
+		args := make([]any, 0, 13*min(len(records), auditInsertRows))
+		for len(records) > 0 {
+			chunk := records[:min(len(records), auditInsertRows)]
+			records = records[len(chunk):]
+			args = args[:0]
+			for _, r := range chunk {
+				e := r.event
+				args = append(args, e.EventType, nullableInt64(e.UserID), nullableInt64(e.AdminChatID), nullableInt64(e.ChatID), nullableInt(e.MessageID), nullableInt(e.MappedMessageID), nullableString(e.MessageKind), boolInt(e.IsEdited), nullableString(e.Direction), e.Outcome, nullableString(e.ErrorClass), nullableString(e.ErrorCode), r.createdAt)
+			}
+			var err error
+			if len(chunk) == auditInsertRows {
+				_, err = stmt(ctx, s.insertAuditStmt).ExecContext(ctx, args...)
+			} else {
+				_, err = s.exec(ctx, auditInsertQuery(len(chunk)), args...)
+			}
+			if err != nil {
+				return err
+			}
+		}
+		return nil
+	})
 }
 
 func (s *SQLite) GetStatsCounts(ctx context.Context, sinceISO string) ([]StatCount, error) {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, `SELECT event_type, outcome, COUNT(*) AS cnt FROM audit_events WHERE created_at >= ? GROUP BY event_type, outcome`, sinceISO)
+	rows, err := s.reader.QueryContext(ctx, `SELECT event_type, outcome, COUNT(*) AS cnt FROM audit_events WHERE created_at >= ? GROUP BY event_type, outcome`, sinceISO)
 	if err != nil {
 		return nil, err
 	}
@@ -684,9 +1171,7 @@ func (s *SQLite) GetTopUsersByEvents(ctx context.Context, sinceISO string, limit
 	if limit <= 0 {
 		limit = 10
 	}
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	rows, err := s.db.QueryContext(ctx, `SELECT user_id, COUNT(*) AS cnt FROM audit_events WHERE created_at >= ? AND user_id IS NOT NULL GROUP BY user_id ORDER BY cnt DESC LIMIT ?`, sinceISO, limit)
+	rows, err := s.reader.QueryContext(ctx, `SELECT user_id, COUNT(*) AS cnt FROM audit_events WHERE created_at >= ? AND user_id IS NOT NULL GROUP BY user_id ORDER BY cnt DESC LIMIT ?`, sinceISO, limit)
 	if err != nil {
 		return nil, err
 	}
@@ -703,23 +1188,32 @@ func (s *SQLite) GetTopUsersByEvents(ctx context.Context, sinceISO string, limit
 }
 
 func (s *SQLite) DeleteMappingsByAdminMessage(ctx context.Context, adminChatID int64, adminMessageID int) (int64, error) {
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	res, err := s.db.ExecContext(ctx, `DELETE FROM message_map WHERE admin_chat_id = ? AND admin_message_id = ?`, adminChatID, adminMessageID)
+	res, err := s.exec(ctx, `DELETE FROM message_map WHERE admin_chat_id = ? AND admin_message_id = ?`, adminChatID, adminMessageID)
 	if err != nil {
 		return 0, err
 	}
+	key := adminMessageKey{adminChatID, adminMessageID}
+	invalidate(ctx, func() {
+		s.targets.Remove(key)
+		s.linked.Purge()
+	})
 	return res.RowsAffected()
 }
 
 func scanRule(scanner interface{ Scan(dest ...any) error }) (Rule, error) {
 	var r Rule
-	var enabled int
-	err := scanner.Scan(&r.ID, &r.TriggerType, &r.TriggerText, &r.ReplyText, &r.Priority, &enabled, &r.CreatedByAdminID, &r.CreatedAt, &r.UpdatedAt)
-	r.IsEnabled = enabled != 0
+	err := scanner.Scan(&r.ID, &r.TriggerType, &r.TriggerText, &r.ReplyText, &r.Priority, &r.IsEnabled, &r.CreatedByAdminID, &r.CreatedAt, &r.UpdatedAt)
 	return r, err
 }
 
+func sqliteDSN(path string, params ...string) string {
+	query := make([]string, 0, len(sqlitePragmas)+len(params))
+	for _, pragma := range sqlitePragmas {
+		query = append(query, "_pragma="+pragma)
+	}
+	return path + "?" + strings.Join(append(query, params...), "&")
+}
+
 func nullString(value string) sql.NullString {
 	if strings.TrimSpace(value) == "" {
 		return sql.NullString{}
@@ -756,11 +1250,8 @@ func boolInt(value bool) int {
 }
 
 func expiredISO(value string) bool {
-	parsed, err := time.Parse(time.RFC3339, value)
-	if err != nil {
-		parsed, err = time.Parse("2006-01-02T15:04:05", value)
-	}
-	return err == nil && !parsed.After(time.Now().UTC())
+	parsed, err := domain.ParseISOTime(value)
+	return err == nil && !parsed.After(time.Now())
 }
 
 func FormatBanInfo(b Ban) string {
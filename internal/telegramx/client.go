@@ -2,9 +2,17 @@ package telegramx
 
 import (
 	"context"
+	"crypto/subtle"
+	"encoding/json"
+	"errors"
 	"fmt"
 	"log"
+	"net"
+	"net/http"
+	"net/url"
 	"strings"
+	"sync"
+	"time"
 
 	"telegramrelaypm/internal/config"
 
@@ -15,6 +23,8 @@ const (
 	MaxBotNameLen             = 64
 	MaxBotDescriptionLen      = 512
 	MaxBotShortDescriptionLen = 120
+
+	webhookBufferSize = 128
 )
 
 type Button struct {
@@ -46,6 +56,13 @@ type CopyMessageRequest struct {
 	ReplyMarkup *InlineKeyboard
 }
 
+type CopyMessagesRequest struct {
+	ChatID     int64
+	ThreadID   *int
+	FromChatID int64
+	MessageIDs []int
+}
+
 type EditTextRequest struct {
 	ChatID    int64
 	MessageID int
@@ -63,6 +80,7 @@ type EditCaptionRequest struct {
 type Client interface {
 	SendMessage(ctx context.Context, req SendMessageRequest) (int, error)
 	CopyMessage(ctx context.Context, req CopyMessageRequest) (int, error)
+	CopyMessages(ctx context.Context, req CopyMessagesRequest) ([]int, error)
 	EditMessageText(ctx context.Context, req EditTextRequest) error
 	EditMessageCaption(ctx context.Context, req EditCaptionRequest) error
 	DeleteMessage(ctx context.Context, chatID int64, messageID int) error
@@ -79,33 +97,125 @@ type TelegoClient struct {
 	Bot *telego.Bot
 }
 
-func New(token string) (*TelegoClient, error) {
-	bot, err := telego.NewBot(token)
+func New(token, apiURL string) (*TelegoClient, error) {
+	var options []telego.BotOption
+	if apiURL != "" {
+		options = append(options, telego.WithAPIServer(apiURL))
+	}
+	bot, err := telego.NewBot(token, options...)
 	if err != nil {
 		return nil, err
 	}
 	return &TelegoClient{Bot: bot}, nil
 }
 
+var allowedUpdates = []string{
+	telego.MessageUpdates,
+	telego.EditedMessageUpdates,
+	telego.CallbackQueryUpdates,
+	telego.ChannelPostUpdates,
+	telego.EditedChannelPostUpdates,
+	telego.MyChatMemberUpdates,
+	telego.ChatMemberUpdates,
+}
+
 func AllowedUpdates() []string {
-	return []string{
-		telego.MessageUpdates,
-		telego.EditedMessageUpdates,
-		telego.CallbackQueryUpdates,
-		telego.ChannelPostUpdates,
-		telego.EditedChannelPostUpdates,
-		telego.MyChatMemberUpdates,
-		telego.ChatMemberUpdates,
-	}
+	return append([]string(nil), allowedUpdates...)
 }
 
-func (c *TelegoClient) Updates(ctx context.Context) (<-chan telego.Update, error) {
+func (c *TelegoClient) Updates(ctx context.Context, cfg *config.Config) (<-chan telego.Update, error) {
+	if cfg.WebhookURL != "" {
+		return c.updatesViaWebhook(ctx, cfg)
+	}
+	// A webhook left over from an earlier WEBHOOK_URL run makes Telegram
+	// reject getUpdates with 409 Conflict.
+	if err := c.Bot.DeleteWebhook(ctx, &telego.DeleteWebhookParams{}); err != nil {
+		log.Printf("delete webhook before long polling failed: %v", err)
+	}
 	return c.Bot.UpdatesViaLongPolling(ctx, &telego.GetUpdatesParams{
 		Timeout:        60,
-		AllowedUpdates: AllowedUpdates(),
+		AllowedUpdates: allowedUpdates,
 	})
 }
 
+// updatesViaWebhook serves Telegram's pushes on cfg.WebhookListen and
+// registers cfg.WebhookURL, so no getUpdates round trip sits between updates.
+// The webhook stays registered on shutdown: Telegram then holds updates
+// until the next start instead of dropping them, and switching back to long
+// polling deletes it.
+func (c *TelegoClient) updatesViaWebhook(ctx context.Context, cfg *config.Config) (<-chan telego.Update, error) {
+	path := "/"
+	if u, err := url.Parse(cfg.WebhookURL); err == nil && u.Path != "" {
+		path = u.Path
+	}
+	secret := []byte(cfg.WebhookSecret)
+	updates := make(chan telego.Update, webhookBufferSize)
+	var (
+		closeMu sync.RWMutex
+		closed  bool
+	)
+	mux := http.NewServeMux()
+	mux.HandleFunc(path, func(w http.ResponseWriter, r *http.Request) {
+		if r.Method != http.MethodPost {
+			w.WriteHeader(http.StatusMethodNotAllowed)
+			return
+		}
+		if subtle.ConstantTimeCompare([]byte(r.Header.Get("X-Telegram-Bot-Api-Secret-Token")), secret) != 1 {
+			w.WriteHeader(http.StatusUnauthorized)
+			return
+		}
+		var update telego.Update
+		if err := json.NewDecoder(r.Body).Decode(&update); err != nil {
+			w.WriteHeader(http.StatusBadRequest)
+			return
+		}
+		closeMu.RLock()
+		defer closeMu.RUnlock()
+		if closed {
+			w.WriteHeader(http.StatusServiceUnavailable)
+			return
+		}
+		select {
+		case updates <- update:
+			w.WriteHeader(http.StatusOK)
+		case <-r.Context().Done():
+		case <-ctx.Done():
+			w.WriteHeader(http.StatusServiceUnavailable)
+		}
+	})
+
+	listener, err := net.Listen("tcp", cfg.WebhookListen)
+	if err != nil {
+		return nil, err
+	}
+	if err := c.Bot.SetWebhook(ctx, &telego.SetWebhookParams{
+		URL:            cfg.WebhookURL,
+		AllowedUpdates: allowedUpdates,
+		SecretToken:    cfg.WebhookSecret,
+	}); err != nil {
+		_ = listener.Close()
+		return nil, err
+	}
+
+	server := &http.Server{Handler: mux, ReadHeaderTimeout: 10 * time.Second}
+	go func() {
+		if err := server.Serve(listener); err != nil && !errors.Is(err, http.ErrServerClosed) {
+			log.Printf("webhook server stopped: %v", err)
+		}
+	}()
+	go func() {
+		<-ctx.Done()
+		shutdownCtx, cancel := context.WithTimeout(context.Background(), 5*time.Second)
+		defer cancel()
+		_ = server.Shutdown(shutdownCtx)
+		closeMu.Lock()
+		closed = true
+		close(updates)
+		closeMu.Unlock()
+	}()
+	return updates, nil
+}
+
 func (c *TelegoClient) SendMessage(ctx context.Context, req SendMessageRequest) (int, error) {
 	params := &telego.SendMessageParams{
 		ChatID:      chatID(req.ChatID),
@@ -145,6 +255,28 @@ func (c *TelegoClient) CopyMessage(ctx context.Context, req CopyMessageRequest)
 	return msgID.MessageID, nil
 }
 
+// CopyMessages copies several messages in one call; albums stay grouped.
+// MessageIDs must be in increasing order.
+func (c *TelegoClient) CopyMessages(ctx context.Context, req CopyMessagesRequest) ([]int, error) {
+	params := &telego.CopyMessagesParams{
+		ChatID:     chatID(req.ChatID),
+		FromChatID: chatID(req.FromChatID),
+		MessageIDs: req.MessageIDs,
+	}
+	if req.ThreadID != nil {
+		params.MessageThreadID = *req.ThreadID
+	}
+	ids, err := c.Bot.CopyMessages(ctx, params)
+	if err != nil {
+		return nil, err
+	}
+	sent := make([]int, len(ids))
+	for i, id := range ids {
+		sent[i] = id.MessageID
+	}
+	return sent, nil
+}
+
 func (c *TelegoClient) EditMessageText(ctx context.Context, req EditTextRequest) error {
 	_, err := c.Bot.EditMessageText(ctx, &telego.EditMessageTextParams{
 		ChatID:    chatID(req.ChatID),
@@ -195,49 +327,65 @@ func (c *TelegoClient) GetChatMember(ctx context.Context, chatIDValue, userID in
 	return c.Bot.GetChatMember(ctx, &telego.GetChatMemberParams{ChatID: chatID(chatIDValue), UserID: userID})
 }
 
+// SetupProfile pushes the configured name, descriptions and command menus. The
+// calls are independent, so they run concurrently and all errors are joined.
 func (c *TelegoClient) SetupProfile(ctx context.Context, cfg *config.Config) error {
+	var (
+		wg   sync.WaitGroup
+		mu   sync.Mutex
+		errs []error
+	)
+	run := func(call func() error) {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			if err := call(); err != nil {
+				mu.Lock()
+				errs = append(errs, err)
+				mu.Unlock()
+			}
+		}()
+	}
 	if cfg.BotName != "" {
-		if err := c.Bot.SetMyName(ctx, &telego.SetMyNameParams{Name: trimWithLog("BOT_NAME", cfg.BotName, MaxBotNameLen)}); err != nil {
-			return err
-		}
+		run(func() error {
+			return c.Bot.SetMyName(ctx, &telego.SetMyNameParams{Name: trimWithLog("BOT_NAME", cfg.BotName, MaxBotNameLen)})
+		})
 	}
 	if cfg.BotDescription != "" {
-		if err := c.Bot.SetMyDescription(ctx, &telego.SetMyDescriptionParams{Description: trimWithLog("BOT_DESCRIPTION", cfg.BotDescription, MaxBotDescriptionLen)}); err != nil {
-			return err
-		}
+		run(func() error {
+			return c.Bot.SetMyDescription(ctx, &telego.SetMyDescriptionParams{Description: trimWithLog("BOT_DESCRIPTION", cfg.BotDescription, MaxBotDescriptionLen)})
+		})
 	}
 	if cfg.BotShortDescription != "" {
-		if err := c.Bot.SetMyShortDescription(ctx, &telego.SetMyShortDescriptionParams{ShortDescription: trimWithLog("BOT_SHORT_DESCRIPTION", cfg.BotShortDescription, MaxBotShortDescriptionLen)}); err != nil {
-			return err
-		}
+		run(func() error {
+			return c.Bot.SetMyShortDescription(ctx, &telego.SetMyShortDescriptionParams{ShortDescription: trimWithLog("BOT_SHORT_DESCRIPTION", cfg.BotShortDescription, MaxBotShortDescriptionLen)})
+		})
 	}
 	if len(cfg.BotUserCommands) > 0 {
-		if err := c.Bot.SetMyCommands(ctx, &telego.SetMyCommandsParams{
-			Commands: toBotCommands(cfg.BotUserCommands),
-			Scope:    &telego.BotCommandScopeAllPrivateChats{Type: telego.ScopeTypeAllPrivateChats},
-		}); err != nil {
-			return err
-		}
+		run(func() error {
+			return c.Bot.SetMyCommands(ctx, &telego.SetMyCommandsParams{
+				Commands: toBotCommands(cfg.BotUserCommands),
+				Scope:    &telego.BotCommandScopeAllPrivateChats{Type: telego.ScopeTypeAllPrivateChats},
+			})
+		})
 	}
 	if len(cfg.BotAdminCommands) > 0 {
-		for _, adminID := range cfg.AdminChatIDs {
-			if err := c.Bot.SetMyCommands(ctx, &telego.SetMyCommandsParams{
-				Commands: toBotCommands(cfg.BotAdminCommands),
-				Scope:    &telego.BotCommandScopeChat{Type: telego.ScopeTypeChat, ChatID: chatID(adminID)},
-			}); err != nil {
-				return err
-			}
-		}
+		adminCommands := toBotCommands(cfg.BotAdminCommands)
+		scopes := append([]int64(nil), cfg.AdminChatIDs...)
 		if cfg.RelayMode == config.RelayModeGroupTopic && cfg.AdminGroupChatID != nil {
-			if err := c.Bot.SetMyCommands(ctx, &telego.SetMyCommandsParams{
-				Commands: toBotCommands(cfg.BotAdminCommands),
-				Scope:    &telego.BotCommandScopeChat{Type: telego.ScopeTypeChat, ChatID: chatID(*cfg.AdminGroupChatID)},
-			}); err != nil {
-				return err
-			}
+			scopes = append(scopes, *cfg.AdminGroupChatID)
+		}
+		for _, id := range scopes {
+			run(func() error {
+				return c.Bot.SetMyCommands(ctx, &telego.SetMyCommandsParams{
+					Commands: adminCommands,
+					Scope:    &telego.BotCommandScopeChat{Type: telego.ScopeTypeChat, ChatID: chatID(id)},
+				})
+			})
 		}
 	}
-	return nil
+	wg.Wait()
+	return errors.Join(errs...)
 }
 
 func toReplyMarkup(keyboard *InlineKeyboard) telego.ReplyMarkup {